@@ -1,11 +1,18 @@
 """
 Flask Application Factory
 """
-from flask import Flask
+from flask import Flask, jsonify
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
 from config import config
+from app.utils.json_provider import init_json_provider
+from app.utils.cache import TTLCache
+from concurrent.futures import ThreadPoolExecutor
 import os
 import logging
+import logging.handlers
+import queue
+import atexit
 import sys
 
 def setup_logging(app, config_name):
@@ -27,13 +34,21 @@ def setup_logging(app, config_name):
         )
         console_handler.setFormatter(formatter)
         
+        # Request threads only enqueue records; a listener thread does the writes
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        listener = logging.handlers.QueueListener(log_queue, console_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+        app.extensions['log_listener'] = listener
+        
         # Add handler to app logger
-        app.logger.addHandler(console_handler)
+        app.logger.addHandler(queue_handler)
         
         # Also configure root logger for our services
         root_logger = logging.getLogger()
         root_logger.setLevel(log_level)
-        root_logger.addHandler(console_handler)
+        root_logger.addHandler(queue_handler)
         
         app.logger.info("🔧 Debug logging enabled for STT troubleshooting")
     else:
@@ -50,20 +65,64 @@ def create_app(config_name='default'):
     app.config.from_object(config[config_name])
     config[config_name].init_app(app)
     
+    # Resolve the temp folder once; /temp downloads join filenames onto it
+    app.config['TEMP_FOLDER_ABS'] = os.path.abspath(app.config['TEMP_FOLDER'])
+    
     # Configure logging
     setup_logging(app, config_name)
     
+    # Serialize JSON responses with orjson when it is installed
+    init_json_provider(app)
+    
     # Enable CORS
     CORS(app)
     
-    # Register blueprints
-    from app.routes import main, stt, tts, dubbing, voice_clone
+    # Background worker for deleting temporary files off the request thread
+    app.extensions['file_reaper'] = ThreadPoolExecutor(max_workers=1, thread_name_prefix='file-reaper')
+    
+    # Per-user payloads referenced by ids in the session cookie
+    app.extensions['state'] = TTLCache(
+        maxsize=app.config['STATE_CACHE_SIZE'],
+        ttl=app.config['STATE_CACHE_TTL']
+    )
+    
+    # Per-user cloned voice lists in Redis, shared by workers and kept across
+    # restarts; without it they stay in the session cookie
+    if app.config['VOICE_STORE_REDIS_URL']:
+        from app.utils.voices import RedisVoiceStore
+        app.extensions['voice_store'] = RedisVoiceStore.from_url(
+            app.config['VOICE_STORE_REDIS_URL'],
+            ttl=app.config['VOICE_STORE_TTL']
+        )
+    
+    @app.errorhandler(413)
+    def request_too_large(error):
+        """Reject oversized uploads with the same JSON shape as the API routes"""
+        return jsonify({
+            'success': False,
+            'error': f'File size exceeds maximum allowed size of {app.config["MAX_FILE_SIZE_MB"]} MB'
+        }), 413
+    
+    @app.errorhandler(Exception)
+    def unhandled_exception(error):
+        """Turn uncaught route errors into the API's JSON error shape"""
+        # Let aborts and other HTTP errors keep their own status codes
+        if isinstance(error, HTTPException):
+            return error
+        app.logger.exception(error)
+        return jsonify({'success': False, 'error': str(error)}), 500
+    
+    # Register blueprints. Route modules only import their services inside the
+    # view functions, so registering them does not load OpenAI/MiniMax/FFmpeg
+    # clients until the first API request that needs them.
+    from app.routes import main, stt, tts, dubbing, voice_clone, jobs
     
     app.register_blueprint(main.bp)
     app.register_blueprint(stt.bp, url_prefix='/api/stt')
     app.register_blueprint(tts.bp, url_prefix='/api/tts')
     app.register_blueprint(dubbing.bp, url_prefix='/dubbing')
     app.register_blueprint(voice_clone.bp, url_prefix='/voice-clone')
+    app.register_blueprint(jobs.bp, url_prefix='/jobs')
     
     return app
 
@@ -1,19 +1,64 @@
 """
 Video Dubbing API routes
 """
-from flask import Blueprint, request, jsonify, session, current_app, send_file
-from app.services.dubbing_service import dubbing_service
-from app.utils.file_utils import save_uploaded_file, cleanup_file, validate_file_size, is_video_file
+from flask import Blueprint, request, jsonify, Response, current_app
+from app.utils.file_utils import save_uploaded_file, schedule_cleanup, is_video_file, send_temp_file
 from app.utils.validators import sanitize_text
+from app.utils.session_state import set_state, get_state
+from app.utils.voices import get_cloned_voice_options
 import os
+import json
 
 bp = Blueprint('dubbing', __name__)
 
+# Available dubbing target languages
+LANGUAGES = [
+    {'code': 'en', 'name': 'English'},
+    {'code': 'tr', 'name': 'Turkish'},
+    {'code': 'es', 'name': 'Spanish'},
+    {'code': 'fr', 'name': 'French'},
+    {'code': 'de', 'name': 'German'},
+    {'code': 'it', 'name': 'Italian'},
+    {'code': 'pt', 'name': 'Portuguese'},
+    {'code': 'ru', 'name': 'Russian'},
+    {'code': 'ja', 'name': 'Japanese'},
+    {'code': 'ko', 'name': 'Korean'},
+    {'code': 'zh', 'name': 'Chinese'},
+    {'code': 'ar', 'name': 'Arabic'},
+    {'code': 'hi', 'name': 'Hindi'},
+    {'code': 'nl', 'name': 'Dutch'},
+    {'code': 'pl', 'name': 'Polish'}
+]
+
+# Standard OpenAI voices
+STANDARD_VOICES = [
+    {'id': 'alloy', 'name': 'Alloy', 'type': 'standard', 'description': 'Neutral and balanced'},
+    {'id': 'echo', 'name': 'Echo', 'type': 'standard', 'description': 'Male voice'},
+    {'id': 'fable', 'name': 'Fable', 'type': 'standard', 'description': 'Warm and expressive'},
+    {'id': 'onyx', 'name': 'Onyx', 'type': 'standard', 'description': 'Deep male voice'},
+    {'id': 'nova', 'name': 'Nova', 'type': 'standard', 'description': 'Female voice'},
+    {'id': 'shimmer', 'name': 'Shimmer', 'type': 'standard', 'description': 'Soft female voice'}
+]
+
+
+def _dumps(obj):
+    """Serialize to compact JSON bytes"""
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+# These payloads never change, so serialize them once at import time
+_LANGUAGES_JSON = _dumps({'success': True, 'languages': LANGUAGES})
+_STANDARD_VOICES_JSON = _dumps(STANDARD_VOICES)[1:-1]
+
 
 @bp.route('/process', methods=['POST'])
 def process_dubbing():
     """Process video dubbing"""
     
+    # Imported on first use; pulls in every other service (Whisper, TTS, MiniMax)
+    from app.services.dubbing_service import dubbing_service
+    from app.services.job_service import run_or_enqueue
+    
     # Check if video file is present
     if 'video' not in request.files:
         return jsonify({'success': False, 'error': 'No video file provided'}), 400
@@ -52,47 +97,47 @@ def process_dubbing():
     except ValueError:
         return jsonify({'success': False, 'error': 'Invalid speed factor'}), 400
     
-    try:
-        # Save uploaded video
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        video_path = save_uploaded_file(video_file, folder=upload_folder, prefix='dubbing')
-        
-        # Validate file size (max 200MB as configured)
-        max_size = current_app.config['MAX_FILE_SIZE_BYTES']
-        if not validate_file_size(video_path, max_size):
-            cleanup_file(video_path)
-            return jsonify({
-                'success': False,
-                'error': f'Video file size exceeds maximum allowed size of {current_app.config["MAX_FILE_SIZE_MB"]} MB'
-            }), 400
-        
-        # Process dubbing
-        result = dubbing_service.dub_video(
-            video_path=video_path,
-            target_language=target_language,
-            voice=voice,
-            voice_type=voice_type,
-            source_language=source_language if source_language else None,
-            speed_factor=speed_factor
-        )
-        
-        # Cleanup uploaded video
-        cleanup_file(video_path)
-        
+    # Save uploaded video
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    max_size = current_app.config['MAX_FILE_SIZE_BYTES']
+    video_path = save_uploaded_file(video_file, folder=upload_folder, prefix='dubbing', max_size=max_size)
+    
+    # Reject videos over the size limit (max 200MB as configured)
+    if not video_path:
+        return jsonify({
+            'success': False,
+            'error': f'Video file size exceeds maximum allowed size of {current_app.config["MAX_FILE_SIZE_MB"]} MB'
+        }), 400
+    
+    def work():
+        try:
+            # Process dubbing
+            return dubbing_service.dub_video(
+                video_path=video_path,
+                target_language=target_language,
+                voice=voice,
+                voice_type=voice_type,
+                source_language=source_language if source_language else None,
+                speed_factor=speed_factor
+            )
+        finally:
+            # Cleanup uploaded video
+            schedule_cleanup(video_path)
+    
+    def finalize(result):
         if result['success']:
-            # Store dubbing info in session
-            session['last_dubbing'] = {
+            # Store dubbing info server-side; the session only keeps its id
+            set_state('last_dubbing', {
                 'output_path': result['output_path'],
                 'original_text': result['original_text'],
                 'translated_text': result['translated_text'],
                 'target_language': result['target_language'],
                 'voice': result['voice']
-            }
-            session.modified = True
-            
+            })
+                
             # Get filename for direct access
             filename = os.path.basename(result['output_path'])
-            
+                
             return jsonify({
                 'success': True,
                 'message': 'Video dubbed successfully!',
@@ -110,15 +155,16 @@ def process_dubbing():
         else:
             return jsonify({'success': False, 'error': result['error']}), 500
     
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    # Runs inline, or on the shared job pool when the client sends async=1,
+    # so concurrent dubs are spread across the job workers
+    return run_or_enqueue(work, finalize)
 
 
 @bp.route('/download', methods=['GET'])
 def download_dubbed_video():
     """Download last dubbed video"""
     
-    last_dubbing = session.get('last_dubbing')
+    last_dubbing = get_state('last_dubbing')
     
     if not last_dubbing or 'output_path' not in last_dubbing:
         return jsonify({'success': False, 'error': 'No dubbed video available'}), 404
@@ -128,7 +174,7 @@ def download_dubbed_video():
     if not os.path.exists(output_path):
         return jsonify({'success': False, 'error': 'Dubbed video file not found'}), 404
     
-    return send_file(
+    return send_temp_file(
         output_path,
         mimetype='video/mp4',
         as_attachment=True,
@@ -139,61 +185,23 @@ def download_dubbed_video():
 @bp.route('/languages', methods=['GET'])
 def get_languages():
     """Get available languages for dubbing"""
-    
-    languages = [
-        {'code': 'en', 'name': 'English'},
-        {'code': 'tr', 'name': 'Turkish'},
-        {'code': 'es', 'name': 'Spanish'},
-        {'code': 'fr', 'name': 'French'},
-        {'code': 'de', 'name': 'German'},
-        {'code': 'it', 'name': 'Italian'},
-        {'code': 'pt', 'name': 'Portuguese'},
-        {'code': 'ru', 'name': 'Russian'},
-        {'code': 'ja', 'name': 'Japanese'},
-        {'code': 'ko', 'name': 'Korean'},
-        {'code': 'zh', 'name': 'Chinese'},
-        {'code': 'ar', 'name': 'Arabic'},
-        {'code': 'hi', 'name': 'Hindi'},
-        {'code': 'nl', 'name': 'Dutch'},
-        {'code': 'pl', 'name': 'Polish'}
-    ]
-    
-    return jsonify({'success': True, 'languages': languages})
+    return Response(_LANGUAGES_JSON, mimetype='application/json')
 
 
 @bp.route('/voices', methods=['GET'])
 def get_voices():
     """Get available voices for dubbing (standard + cloned)"""
     
-    # Standard OpenAI voices
-    standard_voices = [
-        {'id': 'alloy', 'name': 'Alloy', 'type': 'standard', 'description': 'Neutral and balanced'},
-        {'id': 'echo', 'name': 'Echo', 'type': 'standard', 'description': 'Male voice'},
-        {'id': 'fable', 'name': 'Fable', 'type': 'standard', 'description': 'Warm and expressive'},
-        {'id': 'onyx', 'name': 'Onyx', 'type': 'standard', 'description': 'Deep male voice'},
-        {'id': 'nova', 'name': 'Nova', 'type': 'standard', 'description': 'Female voice'},
-        {'id': 'shimmer', 'name': 'Shimmer', 'type': 'standard', 'description': 'Soft female voice'}
-    ]
-    
-    # Get cloned voices from session
-    cloned_voices_data = session.get('cloned_voices', [])
-    cloned_voices = [
-        {
-            'id': v['voice_id'],
-            'name': f"{v['name']} (Cloned)",
-            'type': 'cloned',
-            'description': v.get('description', 'Custom cloned voice')
-        }
-        for v in cloned_voices_data
-    ]
-    
-    # Combine all voices
-    all_voices = standard_voices + cloned_voices
-    
-    return jsonify({
-        'success': True,
-        'voices': all_voices,
-        'standard_count': len(standard_voices),
-        'cloned_count': len(cloned_voices)
-    })
-
+    # Cloned voice options are shaped and serialized when voices are saved
+    cloned_count, cloned_json = get_cloned_voice_options()
+    
+    # Splice the dynamic cloned voices after the pre-serialized standard voices
+    voices_json = _STANDARD_VOICES_JSON
+    if cloned_count:
+        voices_json += b',' + cloned_json
+    
+    body = (
+        b'{"success":true,"voices":[' + voices_json + b'],'
+        b'"standard_count":%d,"cloned_count":%d}' % (len(STANDARD_VOICES), cloned_count)
+    )
+    return Response(body, mimetype='application/json')
@@ -0,0 +1,27 @@
+"""
+Background job status routes
+"""
+from flask import Blueprint, jsonify
+
+bp = Blueprint('jobs', __name__)
+
+@bp.route('/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Poll a background job; once done, returns the original route's response"""
+    
+    from app.services.job_service import job_service
+    
+    job = job_service.get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    if job['status'] in ('queued', 'started'):
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': job['status']
+        }), 202
+    
+    # Finished or failed: the same response the synchronous call gives
+    # (finalize runs on the first poll only)
+    return job_service.get_response(job)
@@ -1,8 +1,10 @@
 """
 Main application routes
 """
-from flask import Blueprint, render_template, session, send_from_directory, current_app
-import os
+from flask import Blueprint, render_template, current_app, abort
+from werkzeug.security import safe_join
+from app.utils.file_utils import send_temp_file
+from app.utils.voices import get_cloned_voices
 
 bp = Blueprint('main', __name__)
 
@@ -24,20 +26,34 @@ def stt_page():
 @bp.route('/tts')
 def tts_page():
     """Text-to-Speech page"""
-    # Get cloned voices from session
-    cloned_voices = session.get('cloned_voices', [])
+    # Get the user's cloned voices
+    cloned_voices = get_cloned_voices()
     return render_template('tts.html', cloned_voices=cloned_voices)
 
 @bp.route('/dubbing')
 def dubbing_page():
     """Video dubbing page"""
-    # Get cloned voices from session for dubbing options
-    cloned_voices = session.get('cloned_voices', [])
+    # Get the user's cloned voices for dubbing options
+    cloned_voices = get_cloned_voices()
     return render_template('dubbing.html', cloned_voices=cloned_voices)
 
 @bp.route('/temp/<path:filename>')
 def serve_temp_file(filename):
     """Serve files from temp folder"""
-    temp_folder = os.path.abspath(current_app.config['TEMP_FOLDER'])
-    return send_from_directory(temp_folder, filename)
+    file_path = safe_join(current_app.config['TEMP_FOLDER_ABS'], filename)
+    if file_path is None:
+        abort(404)
+    
+    # send_file stats the file itself, so a missing file surfaces here
+    try:
+        response = send_temp_file(file_path)
+    except (FileNotFoundError, IsADirectoryError):
+        abort(404)
+    
+    # Generated files get unique random names and are never rewritten
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['TEMP_CACHE_MAX_AGE']
+    response.cache_control.immutable = True
+    return response
 
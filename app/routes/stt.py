@@ -2,11 +2,9 @@
 Speech-to-Text API routes
 """
 from flask import Blueprint, request, jsonify, session, current_app
-from app.services.whisper_service import whisper_service
-from app.utils.file_utils import save_uploaded_file, is_audio_file, is_video_file, cleanup_file, validate_file_size
-import os
+from app.utils.file_utils import save_uploaded_file, is_audio_file, is_video_file, schedule_cleanup, get_file_size
+from app.utils.ffmpeg_utils import get_ffmpeg_exe
 import subprocess
-import imageio_ffmpeg
 
 bp = Blueprint('stt', __name__)
 
@@ -14,6 +12,10 @@ bp = Blueprint('stt', __name__)
 def transcribe():
     """Transcribe audio/video file to text"""
     
+    # Imported on first use so the Whisper/OpenAI stack is not loaded at app startup
+    from app.services.whisper_service import whisper_service
+    from app.services.job_service import run_or_enqueue
+    
     # Check if file is present
     if 'file' not in request.files:
         return jsonify({'success': False, 'error': 'No file provided'}), 400
@@ -28,45 +30,42 @@ def transcribe():
     translate_to = request.form.get('translate_to', None)  # Target language for translation
     
     # Validate file type
-    if not (is_audio_file(file.filename) or is_video_file(file.filename)):
+    is_video = is_video_file(file.filename)
+    if not (is_video or is_audio_file(file.filename)):
         return jsonify({
             'success': False,
             'error': 'Invalid file type. Please upload audio or video file.'
         }), 400
     
-    try:
-        # Save uploaded file
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        file_path = save_uploaded_file(file, folder=upload_folder, prefix='stt')
-        
-        # Validate file size
-        max_size = current_app.config['MAX_FILE_SIZE_BYTES']
-        if not validate_file_size(file_path, max_size):
-            cleanup_file(file_path)
-            return jsonify({
-                'success': False,
-                'error': f'File size exceeds maximum allowed size of {current_app.config["MAX_FILE_SIZE_MB"]} MB'
-            }), 400
-        
+    # Save uploaded file
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    max_size = current_app.config['MAX_FILE_SIZE_BYTES']
+    file_path = save_uploaded_file(file, folder=upload_folder, prefix='stt', max_size=max_size)
+    
+    # Reject files over the size limit
+    if not file_path:
+        return jsonify({
+            'success': False,
+            'error': f'File size exceeds maximum allowed size of {current_app.config["MAX_FILE_SIZE_MB"]} MB'
+        }), 400
+    
+    def work():
         # Extract audio from video if needed
         audio_path = file_path
-        if is_video_file(file.filename):
+        if is_video:
             audio_path = extract_audio_from_video(file_path)
             if not audio_path:
-                cleanup_file(file_path)
-                return jsonify({
-                    'success': False,
-                    'error': 'Failed to extract audio from video'
-                }), 500
-        
-        # Transcribe audio (and translate if requested)
-        result = whisper_service.transcribe_audio(audio_path, source_language, translate_to)
-        
-        # Cleanup files
-        cleanup_file(file_path)
-        if audio_path != file_path:
-            cleanup_file(audio_path)
+                schedule_cleanup(file_path)
+                return {'success': False, 'error': 'Failed to extract audio from video'}
         
+        try:
+            # Transcribe audio (and translate if requested)
+            return whisper_service.transcribe_audio(audio_path, source_language, translate_to)
+        finally:
+            # Cleanup files
+            schedule_cleanup(file_path, audio_path if audio_path != file_path else None)
+    
+    def finalize(result):
         if result['success']:
             return jsonify({
                 'success': True,
@@ -79,13 +78,16 @@ def transcribe():
                 'error': result['error']
             }), 500
     
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    # Runs inline, or as a background job when the client sends async=1
+    return run_or_enqueue(work, finalize)
 
 @bp.route('/transcribe-with-timestamps', methods=['POST'])
 def transcribe_with_timestamps():
     """Transcribe audio/video with word-level timestamps"""
     
+    from app.services.whisper_service import whisper_service
+    from app.services.job_service import run_or_enqueue
+    
     if 'file' not in request.files:
         return jsonify({'success': False, 'error': 'No file provided'}), 400
     
@@ -96,35 +98,38 @@ def transcribe_with_timestamps():
     
     language = request.form.get('language', None)
     
-    if not (is_audio_file(file.filename) or is_video_file(file.filename)):
+    is_video = is_video_file(file.filename)
+    if not (is_video or is_audio_file(file.filename)):
         return jsonify({
             'success': False,
             'error': 'Invalid file type. Please upload audio or video file.'
         }), 400
     
-    try:
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        file_path = save_uploaded_file(file, folder=upload_folder, prefix='stt')
-        
-        # Validate file size
-        max_size = current_app.config['MAX_FILE_SIZE_BYTES']
-        if not validate_file_size(file_path, max_size):
-            cleanup_file(file_path)
-            return jsonify({
-                'success': False,
-                'error': f'File size exceeds maximum allowed size of {current_app.config["MAX_FILE_SIZE_MB"]} MB'
-            }), 400
-        
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    max_size = current_app.config['MAX_FILE_SIZE_BYTES']
+    file_path = save_uploaded_file(file, folder=upload_folder, prefix='stt', max_size=max_size)
+    
+    # Reject files over the size limit
+    if not file_path:
+        return jsonify({
+            'success': False,
+            'error': f'File size exceeds maximum allowed size of {current_app.config["MAX_FILE_SIZE_MB"]} MB'
+        }), 400
+    
+    def work():
         audio_path = file_path
-        if is_video_file(file.filename):
+        if is_video:
             audio_path = extract_audio_from_video(file_path)
+            if not audio_path:
+                schedule_cleanup(file_path)
+                return {'success': False, 'error': 'Failed to extract audio from video'}
         
-        result = whisper_service.transcribe_with_timestamps(audio_path, language)
-        
-        cleanup_file(file_path)
-        if audio_path != file_path:
-            cleanup_file(audio_path)
-        
+        try:
+            return whisper_service.transcribe_with_timestamps(audio_path, language)
+        finally:
+            schedule_cleanup(file_path, audio_path if audio_path != file_path else None)
+    
+    def finalize(result):
         if result['success']:
             return jsonify({
                 'success': True,
@@ -135,36 +140,54 @@ def transcribe_with_timestamps():
         else:
             return jsonify({'success': False, 'error': result['error']}), 500
     
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    # Runs inline, or as a background job when the client sends async=1
+    return run_or_enqueue(work, finalize)
 
 def extract_audio_from_video(video_path):
-    """Extract audio from video file using ffmpeg"""
+    """
+    Extract the audio track of a video as 16 kHz mono Opus using ffmpeg
+    
+    Whisper resamples everything to 16 kHz mono internally. Opus at that rate
+    keeps speech intelligible at a fraction of the bytes of PCM or 192k MP3,
+    which is what gets uploaded to the OpenAI API.
+    """
     try:
-        audio_path = video_path.rsplit('.', 1)[0] + '_audio.mp3'
+        audio_path = video_path.rsplit('.', 1)[0] + '_audio.ogg'
         
-        # Get ffmpeg executable from imageio
-        ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
+        # Resolved once per process
+        ffmpeg_exe = get_ffmpeg_exe()
         
         # Use subprocess to run ffmpeg directly
         cmd = [
             ffmpeg_exe,
+            '-nostdin',
+            '-loglevel', 'error',  # Only errors on stderr, no progress output
+            '-threads', '0',
             '-i', video_path,
             '-vn',  # No video
-            '-acodec', 'libmp3lame',
-            '-b:a', '192k',
+            '-acodec', 'libopus',
+            '-b:a', '24k',
+            '-application', 'voip',  # Tuned for speech
+            '-ar', '16000',  # Whisper's native sample rate
+            '-ac', '1',      # Mono
             '-y',  # Overwrite output
             audio_path
         ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        # stderr only carries error lines now, so it is cheap to keep for logging
+        result = subprocess.run(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
         
         if result.returncode != 0:
-            print(f"FFmpeg error: {result.stderr}")
+            print(f"FFmpeg error: {result.stderr.decode(errors='replace')}")
             return None
         
         # Check if audio file was created
-        if os.path.exists(audio_path) and os.path.getsize(audio_path) > 0:
+        if get_file_size(audio_path) > 0:
             return audio_path
         else:
             print("Error: Audio file was not created or is empty")
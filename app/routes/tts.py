@@ -1,120 +1,133 @@
 """
 Text-to-Speech API routes
 """
-from flask import Blueprint, request, jsonify, session, send_file, current_app
-from app.services.tts_service import tts_service
-from app.services.voice_clone_service import voice_clone_service
-from app.utils.validators import validate_text_length, sanitize_text
-from app.utils.file_utils import cleanup_file
+from flask import Blueprint, request, jsonify, current_app
+from app.utils.validators import sanitize_and_check
+from app.utils.file_utils import send_temp_file
+from app.utils.session_state import set_state, get_state
+from functools import wraps
 import os
 
 bp = Blueprint('tts', __name__)
 
+# Standard OpenAI voices (tuple keeps the order for error messages)
+STANDARD_VOICES = ('alloy', 'echo', 'fable', 'onyx', 'nova', 'shimmer')
+_STANDARD_VOICE_SET = frozenset(STANDARD_VOICES)
+
+# Voice picker entries returned by /voices
+VOICE_DESCRIPTIONS = (
+    {'id': 'alloy', 'name': 'Alloy', 'description': 'Neutral and balanced'},
+    {'id': 'echo', 'name': 'Echo', 'description': 'Male voice'},
+    {'id': 'fable', 'name': 'Fable', 'description': 'Warm and expressive'},
+    {'id': 'onyx', 'name': 'Onyx', 'description': 'Deep male voice'},
+    {'id': 'nova', 'name': 'Nova', 'description': 'Female voice'},
+    {'id': 'shimmer', 'name': 'Shimmer', 'description': 'Soft female voice'}
+)
+
+def validated_tts_payload(allow_cloned=False):
+    """
+    Validate text and voice for a TTS route before calling it
+    
+    The wrapped view is called as view(data, text, voice) with the sanitized
+    text; invalid requests get a 400 JSON error instead.
+    
+    Args:
+        allow_cloned: Also accept 'cloned:<voice_id>' voices
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            data = request.get_json() if request.is_json else request.form
+            text = data.get('text', '').strip()
+            voice = data.get('voice', 'alloy')
+            
+            # Validate text
+            if not text:
+                return jsonify({'success': False, 'error': 'Text is required'}), 400
+            
+            # Sanitize text and validate its length
+            max_text = current_app.config['MAX_TEXT_LENGTH']
+            text, within_limit = sanitize_and_check(text, max_text)
+            if not within_limit:
+                return jsonify({
+                    'success': False,
+                    'error': f'Text exceeds maximum length of {max_text} characters'
+                }), 400
+            
+            # Validate voice
+            is_cloned = allow_cloned and voice.startswith('cloned:')
+            if not is_cloned and voice not in _STANDARD_VOICE_SET:
+                return jsonify({
+                    'success': False,
+                    'error': f'Invalid voice. Choose from: {", ".join(STANDARD_VOICES)}'
+                }), 400
+            
+            return view(data, text, voice, *args, **kwargs)
+        return wrapper
+    return decorator
+
 @bp.route('/generate', methods=['POST'])
-def generate_speech():
+@validated_tts_payload()
+def generate_speech(data, text, voice):
     """Generate speech from text"""
     
-    data = request.get_json() if request.is_json else request.form
-    text = data.get('text', '').strip()
-    voice = data.get('voice', 'alloy')
-    quality = data.get('quality', 'standard')
+    # Imported on first use so the OpenAI stack is not loaded at app startup
+    from app.services.tts_service import tts_service
     
-    # Validate text
-    if not text:
-        return jsonify({'success': False, 'error': 'Text is required'}), 400
-    
-    # Sanitize text
-    text = sanitize_text(text)
-    
-    # Validate text length
-    max_length = current_app.config['MAX_TEXT_LENGTH']
-    if not validate_text_length(text, max_length):
-        return jsonify({
-            'success': False,
-            'error': f'Text exceeds maximum length of {max_length} characters'
-        }), 400
+    quality = data.get('quality', 'standard')
     
-    # Validate voice
-    allowed_voices = ['alloy', 'echo', 'fable', 'onyx', 'nova', 'shimmer']
-    if voice not in allowed_voices:
-        return jsonify({
-            'success': False,
-            'error': f'Invalid voice. Choose from: {", ".join(allowed_voices)}'
-        }), 400
+    # Generate speech
+    if quality == 'hd':
+        result = tts_service.generate_hd_speech(text, voice)
+    else:
+        result = tts_service.generate_speech(text, voice)
     
-    try:
-        # Generate speech
-        if quality == 'hd':
-            result = tts_service.generate_hd_speech(text, voice)
-        else:
-            result = tts_service.generate_speech(text, voice)
+    if result['success']:
+        audio_path = result['audio_path']
         
-        if result['success']:
-            audio_path = result['audio_path']
-            
-            # Return audio file
-            return send_file(
-                audio_path,
-                mimetype='audio/mpeg',
-                as_attachment=True,
-                download_name=f'speech_{voice}.mp3'
-            )
-        else:
-            return jsonify({'success': False, 'error': result['error']}), 500
-    
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        # Return audio inline so players can issue Range requests;
+        # ?download=1 asks for an attachment instead
+        return send_temp_file(
+            audio_path,
+            mimetype='audio/mpeg',
+            as_attachment=request.args.get('download') == '1',
+            download_name=f'speech_{voice}.mp3'
+        )
+    else:
+        return jsonify({'success': False, 'error': result['error']}), 500
 
 @bp.route('/generate-json', methods=['POST'])
-def generate_speech_json():
+@validated_tts_payload(allow_cloned=True)
+def generate_speech_json(data, text, voice):
     """Generate speech and return JSON with file info"""
     
-    data = request.get_json() if request.is_json else request.form
-    text = data.get('text', '').strip()
-    voice = data.get('voice', 'alloy')
+    from app.services.tts_service import tts_service
+    from app.services.voice_clone_service import voice_clone_service
+    from app.services.job_service import run_or_enqueue
+    
     quality = data.get('quality', 'standard')
     translate_to = data.get('translate_to', None)  # Optional translation
     
-    if not text:
-        return jsonify({'success': False, 'error': 'Text is required'}), 400
-    
-    text = sanitize_text(text)
-    
-    max_length = current_app.config['MAX_TEXT_LENGTH']
-    if not validate_text_length(text, max_length):
-        return jsonify({
-            'success': False,
-            'error': f'Text exceeds maximum length of {max_length} characters'
-        }), 400
-    
     # Check if it's a cloned voice
     is_cloned = voice.startswith('cloned:')
     
-    try:
+    def work():
         if is_cloned:
             # Use MiniMax for cloned voice
             voice_id = voice.replace('cloned:', '')
-            result = voice_clone_service.generate_speech_with_cloned_voice(text, voice_id, translate_to=translate_to)
-        else:
-            # Use OpenAI for standard voices
-            allowed_voices = ['alloy', 'echo', 'fable', 'onyx', 'nova', 'shimmer']
-            if voice not in allowed_voices:
-                return jsonify({
-                    'success': False,
-                    'error': f'Invalid voice. Choose from: {", ".join(allowed_voices)}'
-                }), 400
-            
-            if quality == 'hd':
-                result = tts_service.generate_hd_speech(text, voice, translate_to=translate_to)
-            else:
-                result = tts_service.generate_speech(text, voice, translate_to=translate_to)
+            return voice_clone_service.generate_speech_with_cloned_voice(text, voice_id, translate_to=translate_to)
         
+        # Use OpenAI for standard voices
+        if quality == 'hd':
+            return tts_service.generate_hd_speech(text, voice, translate_to=translate_to)
+        return tts_service.generate_speech(text, voice, translate_to=translate_to)
+    
+    def finalize(result):
         if result['success']:
-            # Store audio path in session for later download
-            session['last_audio_path'] = result['audio_path']
+            # Store audio path server-side for later download
+            set_state('last_audio_path', result['audio_path'])
             
             # Get filename for direct access
-            import os
             filename = os.path.basename(result['audio_path'])
             
             return jsonify({
@@ -127,19 +140,19 @@ def generate_speech_json():
         else:
             return jsonify({'success': False, 'error': result['error']}), 500
     
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    # Runs inline, or as a background job when the client sends async=1
+    return run_or_enqueue(work, finalize)
 
 @bp.route('/download', methods=['GET'])
 def download_audio():
     """Download last generated audio"""
     
-    audio_path = session.get('last_audio_path')
+    audio_path = get_state('last_audio_path')
     
     if not audio_path or not os.path.exists(audio_path):
         return jsonify({'success': False, 'error': 'No audio file available'}), 404
     
-    return send_file(
+    return send_temp_file(
         audio_path,
         mimetype='audio/mpeg',
         as_attachment=True,
@@ -149,13 +162,5 @@ def download_audio():
 @bp.route('/voices', methods=['GET'])
 def get_voices():
     """Get available voices"""
-    voices = [
-        {'id': 'alloy', 'name': 'Alloy', 'description': 'Neutral and balanced'},
-        {'id': 'echo', 'name': 'Echo', 'description': 'Male voice'},
-        {'id': 'fable', 'name': 'Fable', 'description': 'Warm and expressive'},
-        {'id': 'onyx', 'name': 'Onyx', 'description': 'Deep male voice'},
-        {'id': 'nova', 'name': 'Nova', 'description': 'Female voice'},
-        {'id': 'shimmer', 'name': 'Shimmer', 'description': 'Soft female voice'}
-    ]
-    return jsonify({'success': True, 'voices': voices})
+    return jsonify({'success': True, 'voices': VOICE_DESCRIPTIONS})
 
@@ -1,10 +1,10 @@
 """
 Voice cloning API routes
 """
-from flask import Blueprint, request, jsonify, session, render_template, current_app, send_from_directory
-from app.services.voice_clone_service import voice_clone_service
-from app.utils.file_utils import save_uploaded_file, cleanup_file, validate_file_size
+from flask import Blueprint, request, jsonify, render_template, send_from_directory, current_app
+from app.utils.file_utils import save_uploaded_file, schedule_cleanup
 from app.utils.validators import sanitize_text
+from app.utils.voices import get_cloned_voices, add_cloned_voice, remove_cloned_voice
 import os
 
 bp = Blueprint('voice_clone', __name__)
@@ -12,14 +12,18 @@ bp = Blueprint('voice_clone', __name__)
 @bp.route('/')
 def index():
     """Voice cloning page"""
-    # Get user's cloned voices from session
-    cloned_voices = session.get('cloned_voices', [])
+    # Get user's cloned voices
+    cloned_voices = get_cloned_voices()
     return render_template('voice_clone.html', cloned_voices=cloned_voices)
 
 @bp.route('/clone', methods=['POST'])
 def clone_voice():
     """Clone a voice from uploaded audio"""
     
+    # Imported on first use so the MiniMax client stack is not loaded at app startup
+    from app.services.voice_clone_service import voice_clone_service
+    from app.services.job_service import run_or_enqueue
+    
     if 'audio' not in request.files:
         return jsonify({'success': False, 'error': 'No audio file provided'}), 400
     
@@ -36,51 +40,34 @@ def clone_voice():
     # Sanitize voice name
     voice_name = sanitize_text(voice_name)
     
-    try:
-        # Save uploaded audio
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        audio_path = save_uploaded_file(audio_file, folder=upload_folder, prefix='voice_clone')
-        
-        # Validate file size (max 10MB for voice samples)
-        max_size = 10 * 1024 * 1024
-        if not validate_file_size(audio_path, max_size):
-            cleanup_file(audio_path)
-            return jsonify({
-                'success': False,
-                'error': 'Audio file size exceeds maximum allowed size of 10 MB'
-            }), 400
-        
-        # Clone the voice
-        result = voice_clone_service.clone_voice(
-            audio_path, 
-            voice_name,
-            voice_description
-        )
-        
-        # Cleanup uploaded file
-        cleanup_file(audio_path)
-        
+    # Save uploaded audio
+    # Voice samples are limited to 10MB
+    max_size = 10 * 1024 * 1024
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    audio_path = save_uploaded_file(audio_file, folder=upload_folder, prefix='voice_clone', max_size=max_size)
+    
+    if not audio_path:
+        return jsonify({
+            'success': False,
+            'error': 'Audio file size exceeds maximum allowed size of 10 MB'
+        }), 400
+    
+    def work():
+        try:
+            # Clone the voice
+            return voice_clone_service.clone_voice(
+                audio_path, 
+                voice_name,
+                voice_description
+            )
+        finally:
+            # Cleanup uploaded file
+            schedule_cleanup(audio_path)
+    
+    def finalize(result):
         if result['success']:
-            # Store cloned voice in session
-            cloned_voices = session.get('cloned_voices', [])
-            
-            # Check if voice already exists (by name)
-            existing_voice = next((v for v in cloned_voices if v['name'] == voice_name), None)
-            
-            if existing_voice:
-                # Update existing voice
-                existing_voice['voice_id'] = result['voice_id']
-                existing_voice['description'] = voice_description
-            else:
-                # Add new voice
-                cloned_voices.append({
-                    'voice_id': result['voice_id'],
-                    'name': voice_name,
-                    'description': voice_description or ''
-                })
-            
-            session['cloned_voices'] = cloned_voices
-            session.modified = True
+            # Store cloned voice for this user (same name replaces the old entry)
+            add_cloned_voice(result['voice_id'], voice_name, voice_description)
             
             return jsonify({
                 'success': True,
@@ -91,13 +78,16 @@ def clone_voice():
         else:
             return jsonify({'success': False, 'error': result['error']}), 500
     
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    # Runs inline, or as a background job when the client sends async=1
+    return run_or_enqueue(work, finalize)
 
 @bp.route('/preview', methods=['POST'])
 def preview_voice():
     """Preview a cloned voice with sample text"""
     
+    from app.services.voice_clone_service import voice_clone_service
+    from app.services.job_service import run_or_enqueue
+    
     data = request.get_json()
     voice_id = data.get('voice_id')
     text = data.get('text', 'Hello! This is a preview of your cloned voice.').strip()
@@ -108,10 +98,11 @@ def preview_voice():
     # Sanitize text
     text = sanitize_text(text)
     
-    try:
+    def work():
         # Generate speech with cloned voice
-        result = voice_clone_service.generate_speech_with_cloned_voice(text, voice_id)
-        
+        return voice_clone_service.generate_speech_with_cloned_voice(text, voice_id)
+    
+    def finalize(result):
         if result['success']:
             audio_path = result['audio_path']
             filename = os.path.basename(audio_path)
@@ -123,13 +114,12 @@ def preview_voice():
         else:
             return jsonify({'success': False, 'error': result['error']}), 500
     
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    return run_or_enqueue(work, finalize)
 
 @bp.route('/list', methods=['GET'])
 def list_voices():
     """Get list of cloned voices"""
-    cloned_voices = session.get('cloned_voices', [])
+    cloned_voices = get_cloned_voices()
     return jsonify({
         'success': True,
         'voices': cloned_voices
@@ -139,30 +129,25 @@ def list_voices():
 def delete_voice():
     """Delete a cloned voice"""
     
+    from app.services.voice_clone_service import voice_clone_service
+    
     data = request.get_json()
     voice_id = data.get('voice_id')
     
     if not voice_id:
         return jsonify({'success': False, 'error': 'Voice ID is required'}), 400
     
-    try:
-        # Delete from ElevenLabs
-        result = voice_clone_service.delete_cloned_voice(voice_id)
-        
-        if result['success']:
-            # Remove from session
-            cloned_voices = session.get('cloned_voices', [])
-            cloned_voices = [v for v in cloned_voices if v['voice_id'] != voice_id]
-            session['cloned_voices'] = cloned_voices
-            session.modified = True
-            
-            return jsonify({
-                'success': True,
-                'message': 'Voice deleted successfully'
-            })
-        else:
-            return jsonify({'success': False, 'error': result['error']}), 500
+    # Delete from ElevenLabs
+    result = voice_clone_service.delete_cloned_voice(voice_id)
     
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    if result['success']:
+        # Remove from the user's voices
+        remove_cloned_voice(voice_id)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Voice deleted successfully'
+        })
+    else:
+        return jsonify({'success': False, 'error': result['error']}), 500
 
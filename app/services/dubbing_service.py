@@ -4,25 +4,84 @@ Handles video dubbing by extracting audio, transcribing, translating,
 generating new speech and merging with video
 """
 import os
+import re
+from pathlib import Path
 import subprocess
-import imageio_ffmpeg
 from flask import current_app
 from app.services.whisper_service import whisper_service
 from app.services.voice_clone_service import voice_clone_service
 from app.services.tts_service import tts_service
+from app.utils.file_utils import schedule_cleanup, get_file_size
+from app.utils.ffmpeg_utils import get_ffmpeg_exe, run_ffmpeg, probe_duration, parse_ffmpeg_duration
+from app.utils.cache import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+import itertools
 import logging
+import math
+import threading
+
+# PyAV is optional; when installed, durations are read in-process
+try:
+    import av
+except ImportError:
+    av = None
+
+# Sentence boundaries used to split long transcripts into chunks
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?\u3002\uff01\uff1f])\s+')
+
+# Audio codecs MP4 can carry as-is, by file extension
+_MP4_AUDIO_EXTENSIONS = frozenset({'.mp3', '.aac', '.m4a'})
+
+# Video containers the Whisper API decodes directly, and its upload limit
+_WHISPER_VIDEO_EXTENSIONS = frozenset({'.mp4', '.mpeg', '.webm'})
+_WHISPER_MAX_BYTES = 25 * 1024 * 1024
+
+# Dubbing re-voices the transcript anyway, so favour speed: greedy decoding
+# without conditioning on the previous window
+_WHISPER_DUBBING_HINTS = {'beam_size': 1, 'condition_on_previous_text': False}
+
+# Speech and video lengths closer than this are treated as equal
+_DURATION_TOLERANCE = 0.05
 
 
 class DubbingService:
     """Service for video dubbing operations"""
     
     def __init__(self):
-        pass
+        # Durations keyed by (path, mtime, size), so rewritten files are re-probed
+        self._duration_cache = TTLCache(maxsize=256, ttl=None)
+        # Side work (e.g. probing) that can overlap the main FFmpeg steps
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='dubbing')
+        # Parallel translate/TTS calls for chunked transcripts, sized from config on first use
+        self._api_executor = None
+        self._lock = threading.Lock()
+        # Intermediate file names: pid, a token that differs between runs, and a counter
+        self._run_token = os.urandom(4).hex()
+        self._counter = itertools.count()
+    
+    def _tmpname(self, prefix, ext):
+        """
+        Name an intermediate file that never leaves the server
+        
+        Public outputs keep random names, since anything in the temp folder
+        can be fetched from /temp and sequential names would be guessable.
+        
+        Args:
+            prefix: File name prefix
+            ext: Extension including the dot
+            
+        Returns:
+            str: Unique file name
+        """
+        return f"{prefix}_{os.getpid()}_{self._run_token}_{next(self._counter):x}{ext}"
     
     def extract_audio_from_video(self, video_path):
         """
         Extract audio from video file using FFmpeg
         
+        The track is written as 16 kHz mono Opus: that is all Whisper uses,
+        and the file is uploaded to the API, so it is kept small.
+        
         Args:
             video_path: Path to video file
             
@@ -30,39 +89,38 @@ class DubbingService:
             str: Path to extracted audio file, or None if failed
         """
         try:
-            logging.info(f"🎬 Extracting audio from: {os.path.basename(video_path)}")
+            video = Path(video_path)
+            logging.info(f"🎬 Extracting audio from: {video.name}")
             
             # Create output path for audio
-            video_dir = os.path.dirname(video_path)
-            video_name = os.path.splitext(os.path.basename(video_path))[0]
-            audio_path = os.path.join(video_dir, f"{video_name}_audio.mp3")
-            
-            # Get FFmpeg executable
-            ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
+            audio = video.with_name(f"{video.stem}_audio.ogg")
+            audio_path = str(audio)
             
             # Extract audio
             cmd = [
-                ffmpeg_exe,
                 '-i', video_path,
                 '-vn',  # No video
-                '-acodec', 'libmp3lame',
-                '-b:a', '192k',
-                '-ar', '44100',
+                '-acodec', 'libopus',
+                '-b:a', '24k',
+                '-application', 'voip',  # Tuned for speech
+                '-ar', '16000',  # Whisper's native sample rate
+                '-ac', '1',      # Mono
                 '-y',  # Overwrite output
                 audio_path
             ]
             
-            logging.info(f"🏃 Running: {' '.join(cmd[:3])} ... {os.path.basename(audio_path)}")
+            logging.info(f"🏃 Running: ffmpeg {' '.join(cmd[:2])} ... {audio.name}")
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            returncode, stderr = run_ffmpeg(cmd)
             
-            if result.returncode != 0:
-                logging.error(f"❌ FFmpeg audio extraction failed: {result.stderr}")
+            if returncode != 0:
+                logging.error(f"❌ FFmpeg audio extraction failed: {stderr}")
                 return None
             
             # Check if audio file was created
-            if os.path.exists(audio_path) and os.path.getsize(audio_path) > 0:
-                logging.info(f"✅ Audio extracted: {os.path.getsize(audio_path)} bytes")
+            audio_size = get_file_size(audio_path)
+            if audio_size > 0:
+                logging.info(f"✅ Audio extracted: {audio_size} bytes")
                 return audio_path
             else:
                 logging.error("❌ Audio file was not created or is empty")
@@ -72,9 +130,15 @@ class DubbingService:
             logging.error(f"❌ Audio extraction error: {str(e)}")
             return None
     
+    def _whisper_accepts_video(self, video_path):
+        """Return True if the video can be uploaded to Whisper without extracting its audio"""
+        if Path(video_path).suffix.lower() not in _WHISPER_VIDEO_EXTENSIONS:
+            return False
+        return 0 < get_file_size(video_path) <= _WHISPER_MAX_BYTES
+    
     def get_media_duration(self, file_path):
         """
-        Get duration of video or audio file using FFmpeg
+        Get duration of video or audio file, reusing earlier probes of the same file
         
         Args:
             file_path: Path to media file
@@ -83,52 +147,61 @@ class DubbingService:
             float: Duration in seconds, or None if failed
         """
         try:
-            ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
-            
-            # Try FFprobe first
-            ffprobe_exe = ffmpeg_exe.replace('ffmpeg', 'ffprobe')
-            if os.path.exists(ffprobe_exe):
-                cmd = [
-                    ffprobe_exe,
-                    '-v', 'quiet',
-                    '-show_entries', 'format=duration',
-                    '-of', 'csv=p=0',
-                    file_path
-                ]
-                
-                result = subprocess.run(cmd, capture_output=True, text=True)
-                
-                if result.returncode == 0:
-                    duration = float(result.stdout.strip())
-                    logging.info(f"📏 Duration (FFprobe): {duration:.2f}s")
-                    return duration
+            stat = os.stat(file_path)
+        except OSError:
+            return self._probe_duration(file_path)
+        
+        key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        duration = self._duration_cache.get(key)
+        if duration is None:
+            duration = self._probe_duration(file_path)
+            if duration is not None:
+                self._duration_cache.set(key, duration)
+        return duration
+    
+    def _probe_duration(self, file_path):
+        """
+        Probe the duration of a media file
+        
+        Reads the container header in-process with PyAV when it is installed,
+        otherwise via FFprobe or a header-only FFmpeg probe; the file is
+        only decoded end to end if the header carries no duration.
+        
+        Args:
+            file_path: Path to media file
             
-            # Fallback: Use FFmpeg with null output to get duration
-            logging.info("⚠️ FFprobe not found, using FFmpeg fallback...")
+        Returns:
+            float: Duration in seconds, or None if failed
+        """
+        try:
+            if av is not None:
+                with av.open(file_path) as container:
+                    if container.duration:
+                        duration = container.duration / av.time_base
+                        logging.info(f"📏 Duration (PyAV): {duration:.2f}s")
+                        return duration
+            
+            # Header only: FFprobe, or "ffmpeg -i" when FFprobe is not installed
+            duration = probe_duration(file_path)
+            if duration is not None:
+                logging.info(f"📏 Duration (header): {duration:.2f}s")
+                return duration
+            
+            # Last resort: decode the whole file to a null sink
+            logging.info("⚠️ No duration in header, decoding with FFmpeg...")
             
             cmd = [
-                ffmpeg_exe,
+                get_ffmpeg_exe(),
                 '-i', file_path,
                 '-f', 'null',
                 '-'
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            # Parse duration from FFmpeg output
-            if result.stderr:
-                # Look for "Duration: HH:MM:SS.ms" in stderr
-                import re
-                duration_match = re.search(r'Duration: (\d{2}):(\d{2}):(\d{2})\.(\d{2})', result.stderr)
-                if duration_match:
-                    hours = int(duration_match.group(1))
-                    minutes = int(duration_match.group(2))
-                    seconds = int(duration_match.group(3))
-                    centiseconds = int(duration_match.group(4))
-                    
-                    total_seconds = hours * 3600 + minutes * 60 + seconds + centiseconds / 100
-                    logging.info(f"📏 Duration (FFmpeg): {total_seconds:.2f}s")
-                    return total_seconds
+            result = subprocess.run(cmd, capture_output=True)
+            duration = parse_ffmpeg_duration(result.stderr)
+            if duration is not None:
+                logging.info(f"📏 Duration (FFmpeg): {duration:.2f}s")
+                return duration
             
             logging.error(f"❌ Could not parse duration from FFmpeg output")
             return None
@@ -137,238 +210,262 @@ class DubbingService:
             logging.error(f"❌ Duration detection error: {str(e)}")
             return None
     
-    def adjust_audio_speed(self, audio_path, speed_factor):
+    def _atempo_filter(self, speed_factor):
         """
-        Adjust audio speed using FFmpeg
+        Build an atempo filter chain for a speed factor
         
         Args:
-            audio_path: Path to audio file
-            speed_factor: Speed factor (1.0 = normal, 1.5 = 50% faster, 0.8 = 20% slower)
+            speed_factor: Speed factor (1.0 = normal)
             
         Returns:
-            str: Path to adjusted audio file
+            str: Comma-separated atempo filters (each limited to 0.5-2.0)
         """
-        try:
-            if speed_factor == 1.0:
-                return audio_path  # No adjustment needed
-            
-            logging.info(f"⚡ Adjusting audio speed by {speed_factor:.2f}x")
+        # atempo accepts 0.5-2.0 per stage; outside that, chain full-strength
+        # stages and let one last stage carry the remainder
+        if speed_factor > 2.0:
+            stages = math.ceil(math.log2(speed_factor / 2.0))
+            atempo_filter = "atempo=2.0," * stages + f"atempo={speed_factor / 2.0 ** stages:.4f}"
+        elif speed_factor < 0.5:
+            stages = math.ceil(math.log2(0.5 / speed_factor))
+            atempo_filter = "atempo=0.5," * stages + f"atempo={speed_factor / 0.5 ** stages:.4f}"
+        else:
+            atempo_filter = f"atempo={speed_factor:.4f}"
+        return atempo_filter
+    
+    def _split_text(self, text, max_chars):
+        """
+        Split text into chunks of at most max_chars, on sentence boundaries where possible
+        
+        Args:
+            text: Text to split
+            max_chars: Maximum chunk length
             
-            # Create output path
-            temp_folder = current_app.config['TEMP_FOLDER']
-            output_path = os.path.join(temp_folder, f"speed_adjusted_{os.urandom(8).hex()}.mp3")
-            
-            ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
-            
-            # Use atempo filter (range: 0.5 to 2.0)
-            if speed_factor > 2.0:
-                # For speeds > 2.0, chain multiple atempo filters
-                atempo_chain = []
-                remaining_speed = speed_factor
-                while remaining_speed > 2.0:
-                    atempo_chain.append("atempo=2.0")
-                    remaining_speed /= 2.0
-                if remaining_speed > 1.0:
-                    atempo_chain.append(f"atempo={remaining_speed:.2f}")
-                atempo_filter = ",".join(atempo_chain)
-            elif speed_factor < 0.5:
-                # For speeds < 0.5, chain multiple atempo filters
-                atempo_chain = []
-                remaining_speed = speed_factor
-                while remaining_speed < 0.5:
-                    atempo_chain.append("atempo=0.5")
-                    remaining_speed /= 0.5
-                if remaining_speed < 1.0:
-                    atempo_chain.append(f"atempo={remaining_speed:.2f}")
-                atempo_filter = ",".join(atempo_chain)
+        Returns:
+            list: Text chunks in order
+        """
+        if len(text) <= max_chars:
+            return [text]
+        
+        chunks = []
+        current = ''
+        for sentence in _SENTENCE_END_RE.split(text.strip()):
+            # Hard-split sentences that are longer than a whole chunk
+            while len(sentence) > max_chars:
+                if current:
+                    chunks.append(current)
+                    current = ''
+                chunks.append(sentence[:max_chars])
+                sentence = sentence[max_chars:]
+            
+            if current and len(current) + 1 + len(sentence) > max_chars:
+                chunks.append(current)
+                current = sentence
             else:
-                atempo_filter = f"atempo={speed_factor:.2f}"
-            
-            cmd = [
-                ffmpeg_exe,
-                '-i', audio_path,
-                '-filter:a', atempo_filter,
-                '-c:a', 'libmp3lame',
-                '-b:a', '192k',
-                '-y',
-                output_path
-            ]
-            
-            logging.info(f"🏃 Running: ffmpeg with speed adjustment...")
+                current = f"{current} {sentence}" if current else sentence
+        
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    def _get_api_executor(self):
+        """Create the translate/TTS worker pool from app config on first use"""
+        if self._api_executor is None:
+            with self._lock:
+                if self._api_executor is None:
+                    self._api_executor = ThreadPoolExecutor(
+                        max_workers=current_app.config['DUBBING_API_WORKERS'],
+                        thread_name_prefix='dubbing-api'
+                    )
+        return self._api_executor
+    
+    def _translate_and_voice(self, batches, translate, generate):
+        """
+        Translate batches of chunks in parallel, voicing each batch as soon as it is back
+        
+        Speech for the first batch is generated while later batches are still
+        being translated, instead of waiting for the whole translation.
+        
+        Args:
+            batches: Lists of text chunks, in order
+            translate: Callable taking a list of chunks and returning the texts to voice;
+                       it runs inside the app context
+            generate: Callable turning one text into a speech result dict;
+                      it runs inside the app context
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+        Returns:
+            tuple: (voiced texts in order, speech results in order)
+        """
+        executor = self._get_api_executor()
+        app = current_app._get_current_object()
+        
+        def in_app(func, arg):
+            with app.app_context():
+                return func(arg)
+        
+        def translate_then_voice(batch):
+            texts = translate(batch)
+            # Queue this batch's speech without waiting for it (or for other batches)
+            return texts, [executor.submit(in_app, generate, text) for text in texts]
+        
+        batch_futures = [executor.submit(in_app, translate_then_voice, batch) for batch in batches]
+        
+        texts = []
+        speech_results = []
+        for future in batch_futures:
+            batch_texts, speech_futures = future.result()
+            texts.extend(batch_texts)
+            speech_results.extend(f.result() for f in speech_futures)
+        return texts, speech_results
+    
+    def _group_chunks(self, chunks, groups):
+        """
+        Split chunks into at most `groups` contiguous lists of similar size
+        
+        Args:
+            chunks: List of chunks
+            groups: Maximum number of groups
             
-            if result.returncode == 0 and os.path.exists(output_path):
-                final_duration = self.get_media_duration(output_path)
-                logging.info(f"✅ Audio speed adjusted: {final_duration:.2f}s")
-                return output_path
-            else:
-                logging.error(f"❌ Speed adjustment failed: {result.stderr}")
-                return audio_path
-                
-        except Exception as e:
-            logging.error(f"❌ Speed adjustment error: {str(e)}")
-            return audio_path
+        Returns:
+            list: Lists of chunks, in order
+        """
+        size = -(-len(chunks) // max(groups, 1))
+        return [chunks[i:i + size] for i in range(0, len(chunks), size)]
     
-    def add_silence_to_audio(self, audio_path, silence_duration):
+    def _concat_audio(self, audio_paths, output_path):
         """
-        Add silence to the end of audio file
+        Join audio files of the same format end to end without re-encoding
         
         Args:
-            audio_path: Path to audio file
-            silence_duration: Duration of silence to add in seconds
+            audio_paths: Paths of audio files in play order
+            output_path: Path for the joined file
             
         Returns:
-            str: Path to extended audio file
+            str: Path to joined audio file, or None if failed
         """
+        list_path = f"{output_path}.txt"
         try:
-            if silence_duration <= 0:
-                return audio_path  # No silence needed
-            
-            logging.info(f"🔇 Adding {silence_duration:.1f}s of silence to audio...")
-            
-            temp_folder = current_app.config['TEMP_FOLDER']
-            output_path = os.path.join(temp_folder, f"extended_{os.urandom(8).hex()}.mp3")
-            ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
+            with open(list_path, 'w', encoding='utf-8') as f:
+                for path in audio_paths:
+                    escaped = os.path.abspath(path).replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
             
             cmd = [
-                ffmpeg_exe,
-                '-i', audio_path,
-                '-af', f'apad=pad_dur={silence_duration}',
-                '-c:a', 'libmp3lame',
-                '-b:a', '192k',
+                '-f', 'concat',
+                '-safe', '0',
+                '-i', list_path,
+                '-c', 'copy',
                 '-y',
                 output_path
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            returncode, stderr = run_ffmpeg(cmd)
             
-            if result.returncode == 0 and os.path.exists(output_path):
-                final_duration = self.get_media_duration(output_path)
-                logging.info(f"✅ Silence added successfully: {final_duration:.2f}s total")
-                return output_path
-            else:
-                logging.error(f"❌ Failed to add silence: {result.stderr}")
-                return audio_path
+            if returncode != 0:
+                logging.error(f"❌ Audio concat failed: {stderr}")
+                return None
+            
+            logging.info(f"✅ Joined {len(audio_paths)} speech chunks")
+            return output_path
                 
         except Exception as e:
-            logging.error(f"❌ Silence addition error: {str(e)}")
-            return audio_path
+            logging.error(f"❌ Audio concat error: {str(e)}")
+            return None
+        finally:
+            schedule_cleanup(list_path)
     
-    def merge_audio_with_video(self, video_path, audio_path, output_path=None, match_audio_duration=True):
+    def finalize_video(self, video_path, tts_audio_path, speed_factor, pad_seconds, out_path, extend_to=None):
         """
-        Merge new audio with video using FFmpeg
+        Speed-adjust, pad and mux the generated speech in a single FFmpeg pass
+        
+        The audio is decoded once, run through one filter graph and encoded
+        straight to AAC in the output MP4, with no intermediate MP3 files.
         
         Args:
             video_path: Path to original video
-            audio_path: Path to new audio file
-            output_path: Optional output path
-            match_audio_duration: If True, extend video to match audio duration
+            tts_audio_path: Path to generated speech audio
+            speed_factor: Speed factor (atempo is skipped at 1.0)
+            pad_seconds: Seconds of silence to append (apad is skipped at 0)
+            out_path: Path for the output video
+            extend_to: Optional duration to extend the video to when the
+                speech runs longer than the original video
             
         Returns:
             str: Path to output video, or None if failed
         """
         try:
-            logging.info(f"🎬 Merging audio with video...")
-            logging.info(f"  📹 Video: {os.path.basename(video_path)}")
-            logging.info(f"  🔊 Audio: {os.path.basename(audio_path)}")
-            
-            # Get durations
-            video_duration = self.get_media_duration(video_path)
-            audio_duration = self.get_media_duration(audio_path)
-            
-            if video_duration and audio_duration:
-                logging.info(f"📏 Duration analysis:")
-                logging.info(f"  📹 Video: {video_duration:.2f}s")
-                logging.info(f"  🔊 Audio: {audio_duration:.2f}s")
-                logging.info(f"  ⚖️ Difference: {abs(audio_duration - video_duration):.2f}s")
-            
-            # Create output path if not provided
-            if not output_path:
-                video_dir = os.path.dirname(video_path)
-                video_name = os.path.splitext(os.path.basename(video_path))[0]
-                output_path = os.path.join(video_dir, f"{video_name}_dubbed.mp4")
-            
-            # Get FFmpeg executable
-            ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
-            
-            if match_audio_duration and audio_duration and video_duration:
-                if audio_duration > video_duration:
-                    # Audio is longer than video - extend video to match audio
-                    logging.info(f"⏰ Extending video to match audio duration ({audio_duration:.2f}s)")
-                    
-                    cmd = [
-                        ffmpeg_exe,
-                        '-i', video_path,      # Input video
-                        '-i', audio_path,      # Input audio
-                        '-c:v', 'libx264',     # Re-encode video to extend
-                        '-c:a', 'aac',         # AAC audio codec
-                        '-b:a', '192k',        # Audio bitrate
-                        '-map', '0:v:0',       # Map video from first input
-                        '-map', '1:a:0',       # Map audio from second input
-                        '-t', str(audio_duration),  # Set duration to audio length
-                        '-y',                  # Overwrite output
-                        output_path
-                    ]
-                else:
-                    # Audio is shorter than video - extend audio with silence to match video
-                    logging.info(f"🔇 Extending audio to match video duration ({video_duration:.2f}s)")
-                    
-                    # First extend audio with silence
-                    extended_audio_path = self.add_silence_to_audio(audio_path, video_duration - audio_duration)
-                    if extended_audio_path != audio_path:
-                        temp_files.append(extended_audio_path)
-                        audio_path = extended_audio_path
-                    
-                    cmd = [
-                        ffmpeg_exe,
-                        '-i', video_path,      # Input video
-                        '-i', audio_path,      # Input audio (now extended)
-                        '-c:v', 'copy',        # Copy video codec (faster)
-                        '-c:a', 'aac',         # AAC audio codec
-                        '-b:a', '192k',        # Audio bitrate
-                        '-map', '0:v:0',       # Map video from first input
-                        '-map', '1:a:0',       # Map audio from second input
-                        '-shortest',           # Finish encoding when shortest input ends
-                        '-y',                  # Overwrite output
-                        output_path
-                    ]
+            logging.info(f"🎬 Finalizing video in one FFmpeg pass...")
+            
+            # Build the audio filter graph from the stages that are needed
+            audio_filters = []
+            if speed_factor != 1.0:
+                audio_filters.append(self._atempo_filter(speed_factor))
+            if pad_seconds > 0:
+                audio_filters.append(f"apad=pad_dur={pad_seconds:.3f}")
+            
+            cmd = [
+                '-i', video_path,      # Input video
+                '-i', tts_audio_path,  # Input speech
+            ]
+            
+            filter_graph = []
+            video_map = '0:v:0'
+            audio_map = '1:a:0'
+            
+            if extend_to:
+                # Speech is longer than the video - hold the last frame for the difference
+                logging.info(f"⏰ Extending video to match audio duration ({extend_to:.2f}s)")
+                video_duration = self.get_media_duration(video_path) or 0
+                hold_seconds = max(extend_to - video_duration, 0)
+                filter_graph.append(f"[0:v]tpad=stop_mode=clone:stop_duration={hold_seconds:.3f}[v]")
+                video_map = '[v]'
+            
+            if audio_filters:
+                filter_graph.append(f"[1:a]{','.join(audio_filters)}[a]")
+                audio_map = '[a]'
+            
+            if filter_graph:
+                cmd += ['-filter_complex', ';'.join(filter_graph)]
+            cmd += ['-map', video_map, '-map', audio_map]
+            
+            if extend_to:
+                # The padded video has to be encoded; favour speed over size
+                cmd += ['-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '23', '-t', f"{extend_to:.3f}"]
             else:
-                # Fallback: Standard merge - use shortest duration
-                logging.info(f"⚠️ Using standard merge (shortest duration)")
-                cmd = [
-                    ffmpeg_exe,
-                    '-i', video_path,      # Input video
-                    '-i', audio_path,      # Input audio
-                    '-c:v', 'copy',        # Copy video codec (faster)
-                    '-c:a', 'aac',         # AAC audio codec
-                    '-b:a', '192k',        # Audio bitrate
-                    '-map', '0:v:0',       # Map video from first input
-                    '-map', '1:a:0',       # Map audio from second input
-                    '-shortest',           # Finish encoding when shortest input ends
-                    '-y',                  # Overwrite output
-                    output_path
+                cmd += ['-c:v', 'copy', '-shortest']
+            
+            if not audio_filters and Path(tts_audio_path).suffix.lower() in _MP4_AUDIO_EXTENSIONS:
+                # Nothing to filter and MP4 accepts the codec - remux without re-encoding
+                cmd += ['-c:a', 'copy']
+            else:
+                cmd += [
+                    '-c:a', 'aac',     # AAC audio codec
+                    '-b:a', '192k',    # Audio bitrate
                 ]
             
-            logging.info(f"🏃 Running: {' '.join(cmd[:5])} ... {os.path.basename(output_path)}")
+            cmd += [
+                '-movflags', '+faststart',  # Index up front so playback starts before download ends
+                '-y',                  # Overwrite output
+                out_path
+            ]
+            
+            logging.info(f"🏃 Running: ffmpeg -filter_complex {';'.join(filter_graph) or '(none)'} ... {os.path.basename(out_path)}")
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            returncode, stderr = run_ffmpeg(cmd)
             
-            if result.returncode != 0:
-                logging.error(f"❌ FFmpeg merge failed: {result.stderr}")
+            if returncode != 0:
+                logging.error(f"❌ FFmpeg finalize failed: {stderr}")
                 return None
             
-            # Check if output file was created
-            if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                final_duration = self.get_media_duration(output_path)
-                logging.info(f"✅ Video merged: {os.path.getsize(output_path)} bytes, duration: {final_duration:.2f}s")
-                return output_path
+            out_size = get_file_size(out_path)
+            if out_size > 0:
+                logging.info(f"✅ Video finalized: {out_size} bytes")
+                return out_path
             else:
                 logging.error("❌ Output video was not created or is empty")
                 return None
                 
         except Exception as e:
-            logging.error(f"❌ Video merge error: {str(e)}")
+            logging.error(f"❌ Video finalize error: {str(e)}")
             return None
     
     def dub_video(self, video_path, target_language='en', voice='alloy', voice_type='standard', source_language=None, speed_factor=1.0):
@@ -395,28 +492,45 @@ class DubbingService:
             logging.info(f"  🗣️ Voice: {voice} ({voice_type})")
             logging.info(f"  ⚡ Speed Factor: {speed_factor:.2f}x")
             
-            # Get original video duration
-            original_video_duration = self.get_media_duration(video_path)
+            # Probe the original video duration while the audio is transcribed
+            duration_future = self._executor.submit(self.get_media_duration, video_path)
+            
+            # Step 1/2: Whisper decodes common video containers itself, so small
+            # videos are sent as-is and audio is only extracted as a fallback
+            transcription_result = None
+            if self._whisper_accepts_video(video_path):
+                logging.info("📝 Step 1-2/6: Transcribing video directly...")
+                transcription_result = whisper_service.transcribe_audio(
+                    video_path,
+                    language=source_language,
+                    **_WHISPER_DUBBING_HINTS
+                )
+                if not transcription_result['success']:
+                    logging.warning(f"⚠️ Direct transcription failed, extracting audio: {transcription_result['error']}")
+            
+            if not transcription_result or not transcription_result['success']:
+                # Step 1: Extract audio from video
+                logging.info("📝 Step 1/6: Extracting audio from video...")
+                audio_path = self.extract_audio_from_video(video_path)
+                if not audio_path:
+                    return {
+                        'success': False,
+                        'error': 'Failed to extract audio from video'
+                    }
+                temp_files.append(audio_path)
+                
+                # Step 2: Transcribe audio
+                logging.info("📝 Step 2/6: Transcribing audio...")
+                transcription_result = whisper_service.transcribe_audio(
+                    audio_path, 
+                    language=source_language,
+                    **_WHISPER_DUBBING_HINTS
+                )
+            
+            original_video_duration = duration_future.result()
             if original_video_duration:
                 logging.info(f"📏 Original video duration: {original_video_duration:.2f}s")
             
-            # Step 1: Extract audio from video
-            logging.info("📝 Step 1/6: Extracting audio from video...")
-            audio_path = self.extract_audio_from_video(video_path)
-            if not audio_path:
-                return {
-                    'success': False,
-                    'error': 'Failed to extract audio from video'
-                }
-            temp_files.append(audio_path)
-            
-            # Step 2: Transcribe audio
-            logging.info("📝 Step 2/6: Transcribing audio...")
-            transcription_result = whisper_service.transcribe_audio(
-                audio_path, 
-                language=source_language
-            )
-            
             if not transcription_result['success']:
                 return {
                     'success': False,
@@ -429,49 +543,72 @@ class DubbingService:
             logging.info(f"✅ Transcribed: {len(original_text)} characters")
             logging.info(f"  📄 Text preview: {original_text[:100]}...")
             
-            # Step 3: Translate text to target language (if needed)
-            translated_text = original_text
-            if target_language and target_language != source_language:
-                logging.info(f"📝 Step 3/6: Translating to {target_language}...")
-                translation_result = tts_service.translate_text(original_text, target_language)
-                
-                if translation_result['success']:
-                    translated_text = translation_result['translated_text']
-                    logging.info(f"✅ Translated: {len(translated_text)} characters")
-                    logging.info(f"  📄 Translation preview: {translated_text[:100]}...")
-                else:
-                    logging.warning(f"⚠️ Translation failed, using original text: {translation_result['error']}")
+            chunk_chars = current_app.config['DUBBING_CHUNK_CHARS']
+            
+            needs_translation = bool(target_language and target_language != source_language)
+            
+            # Step 3/4: Translate (if needed) and generate new speech
+            if needs_translation:
+                logging.info(f"📝 Step 3-4/6: Translating to {target_language} and generating speech with {voice_type} voice...")
             else:
-                logging.info(f"📝 Step 3/6: Skipping translation (same language)")
+                logging.info(f"📝 Step 3-4/6: Skipping translation (same language), generating speech with {voice_type} voice...")
             
-            # Step 4: Generate new speech
-            logging.info(f"📝 Step 4/6: Generating speech with {voice_type} voice...")
+            def translate(batch):
+                if not needs_translation:
+                    return batch
+                translation_result = tts_service.translate_text(batch if len(batch) > 1 else batch[0], target_language)
+                if not translation_result['success']:
+                    logging.warning(f"⚠️ Translation failed, using original text: {translation_result['error']}")
+                    return batch
+                return translation_result.get('translated_texts') or [translation_result['translated_text']]
             
             if voice_type == 'cloned':
                 # Use MiniMax cloned voice
-                speech_result = voice_clone_service.generate_speech_with_cloned_voice(
-                    translated_text,
-                    voice
-                )
+                generate = lambda chunk: voice_clone_service.generate_speech_with_cloned_voice(chunk, voice)
             else:
                 # Use OpenAI standard voice
-                speech_result = tts_service.generate_speech(
-                    translated_text,
-                    voice=voice
-                )
-            
-            if not speech_result['success']:
+                generate = lambda chunk: tts_service.generate_speech(chunk, voice=voice, cache=False)
+            
+            # Long transcripts are split into chunks and sent as a few batched
+            # translation requests (one per API worker); each batch is voiced
+            # chunk by chunk as soon as its translation arrives
+            source_chunks = self._split_text(original_text, chunk_chars)
+            batches = self._group_chunks(source_chunks, current_app.config['DUBBING_API_WORKERS'])
+            translated_chunks, speech_results = self._translate_and_voice(batches, translate, generate)
+            temp_files.extend(r['audio_path'] for r in speech_results if r['success'])
+            
+            translated_text = ' '.join(translated_chunks)
+            if needs_translation:
+                logging.info(f"✅ Translated: {len(translated_text)} characters in {len(source_chunks)} chunk(s)")
+                logging.info(f"  📄 Translation preview: {translated_text[:100]}...")
+            
+            speech_result = next((r for r in speech_results if not r['success']), None)
+            if speech_result:
+                schedule_cleanup(*temp_files)
                 return {
                     'success': False,
                     'error': f"Speech generation failed: {speech_result['error']}"
                 }
             
-            new_audio_path = speech_result['audio_path']
-            temp_files.append(new_audio_path)
+            if len(speech_results) == 1:
+                new_audio_path = speech_results[0]['audio_path']
+            else:
+                temp_folder = current_app.config['TEMP_FOLDER']
+                new_audio_path = self._concat_audio(
+                    [r['audio_path'] for r in speech_results],
+                    os.path.join(temp_folder, self._tmpname('speech', '.mp3'))
+                )
+                if not new_audio_path:
+                    schedule_cleanup(*temp_files)
+                    return {
+                        'success': False,
+                        'error': 'Failed to join generated speech'
+                    }
+                temp_files.append(new_audio_path)
             
-            logging.info(f"✅ Speech generated: {os.path.getsize(new_audio_path)} bytes")
+            logging.info(f"✅ Speech generated: {get_file_size(new_audio_path)} bytes")
             
-            # Step 5: Apply manual speed adjustment only (if user specified)
+            # Step 5: Work out speed adjustment and duration matching
             logging.info(f"📝 Step 5/6: Applying speed adjustment...")
             
             # Get generated audio duration
@@ -482,15 +619,21 @@ class DubbingService:
             # Only apply speed adjustment if user manually changed it from default (1.0)
             if speed_factor != 1.0:
                 logging.info(f"🎯 User specified speed factor: {speed_factor:.2f}x")
-                adjusted_audio_path = self.adjust_audio_speed(new_audio_path, speed_factor)
-                if adjusted_audio_path != new_audio_path:
-                    temp_files.append(adjusted_audio_path)
-                    new_audio_path = adjusted_audio_path
-                    logging.info(f"✅ Audio speed adjusted to {speed_factor:.2f}x")
             else:
                 logging.info(f"✅ Using normal speech speed (1.0x) - no speed adjustment")
             
-            # Step 6: Merge new audio with video (extend video if needed)
+            # Pad short speech with silence, or extend the video for long speech
+            pad_seconds = 0
+            extend_to = None
+            if generated_audio_duration and original_video_duration:
+                adjusted_audio_duration = generated_audio_duration / speed_factor
+                difference = adjusted_audio_duration - original_video_duration
+                if difference > _DURATION_TOLERANCE:
+                    extend_to = adjusted_audio_duration
+                elif difference < -_DURATION_TOLERANCE:
+                    pad_seconds = -difference
+            
+            # Step 6: Speed, pad and merge with video in one FFmpeg pass
             logging.info(f"📝 Step 6/6: Merging new audio with video...")
             
             # Create output path in temp folder
@@ -498,11 +641,13 @@ class DubbingService:
             output_filename = f"dubbed_{os.urandom(8).hex()}.mp4"
             output_path = os.path.join(temp_folder, output_filename)
             
-            merged_video_path = self.merge_audio_with_video(
+            merged_video_path = self.finalize_video(
                 video_path,
                 new_audio_path,
+                speed_factor,
+                pad_seconds,
                 output_path,
-                match_audio_duration=True  # Extend video to match audio
+                extend_to=extend_to
             )
             
             if not merged_video_path:
@@ -516,18 +661,13 @@ class DubbingService:
             
             logging.info(f"✅ Video dubbing completed!")
             logging.info(f"  📹 Output: {os.path.basename(merged_video_path)}")
-            logging.info(f"  📏 Size: {os.path.getsize(merged_video_path)} bytes")
+            logging.info(f"  📏 Size: {get_file_size(merged_video_path)} bytes")
             logging.info(f"  ⏱️ Final duration: {final_duration:.2f}s")
             logging.info(f"  ⚡ Speed factor used: {speed_factor:.2f}x")
             
-            # Cleanup temporary files (but keep the final output)
-            for temp_file in temp_files:
-                try:
-                    if os.path.exists(temp_file):
-                        os.remove(temp_file)
-                        logging.info(f"🧹 Cleaned up: {os.path.basename(temp_file)}")
-                except:
-                    pass
+            # Cleanup temporary files (but keep the final output) in one background batch
+            schedule_cleanup(*temp_files)
+            logging.info(f"🧹 Scheduled cleanup of {len(temp_files)} temporary files")
             
             return {
                 'success': True,
@@ -547,12 +687,7 @@ class DubbingService:
             logging.error(f"❌ Dubbing error: {str(e)}")
             
             # Cleanup on error
-            for temp_file in temp_files:
-                try:
-                    if os.path.exists(temp_file):
-                        os.remove(temp_file)
-                except:
-                    pass
+            schedule_cleanup(*temp_files)
             
             return {
                 'success': False,
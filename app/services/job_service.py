@@ -0,0 +1,130 @@
+"""
+Background job service for long-running API calls
+
+Routes can hand slow external calls (OpenAI, MiniMax) to a small thread pool
+and return a job id immediately; clients then poll /jobs/<job_id>.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, jsonify, request
+from app.utils.cache import TTLCache
+import logging
+import secrets
+import threading
+
+
+class JobService:
+    """Runs jobs on a thread pool and keeps their state for polling"""
+    
+    def __init__(self):
+        self.executor = None
+        self.jobs = None
+        self._lock = threading.Lock()
+    
+    def init_executor(self):
+        """Create the worker pool and job table from app config on first use"""
+        if self.executor is None:
+            with self._lock:
+                if self.executor is None:
+                    config = current_app.config
+                    self.jobs = TTLCache(maxsize=config['JOB_STORE_SIZE'], ttl=config['JOB_RESULT_TTL'])
+                    self.executor = ThreadPoolExecutor(
+                        max_workers=config['JOB_WORKERS'],
+                        thread_name_prefix='job-worker'
+                    )
+        return self.executor
+    
+    def submit(self, work, finalize):
+        """
+        Run work() in the background
+        
+        Args:
+            work: Callable returning a service result dict
+            finalize: Callable turning that result into the route's response;
+                      it runs once, in the first poll after the job finishes,
+                      so it may use the session
+        
+        Returns:
+            str: Job ID
+        """
+        executor = self.init_executor()
+        app = current_app._get_current_object()
+        job_id = secrets.token_urlsafe(16)
+        job = {'status': 'queued', 'result': None, 'finalize': finalize, 'response': None}
+        self.jobs.set(job_id, job)
+        
+        def run():
+            job['status'] = 'started'
+            try:
+                with app.app_context():
+                    job['result'] = work()
+                job['status'] = 'finished'
+            except Exception as e:
+                logging.error(f"❌ Job {job_id} failed: {str(e)}")
+                job['result'] = {'success': False, 'error': str(e)}
+                job['status'] = 'failed'
+        
+        executor.submit(run)
+        logging.info(f"📥 Queued job {job_id}")
+        return job_id
+    
+    def get_job(self, job_id):
+        """Return the job record, or None if unknown or expired"""
+        if self.jobs is None:
+            return None
+        return self.jobs.get(job_id)
+    
+    def get_response(self, job):
+        """
+        Build a finished job's route response, running finalize only once
+        
+        The first poll after completion runs finalize (and its session side
+        effects); later polls replay the stored response.
+        
+        Args:
+            job: Job record in 'finished' or 'failed' state
+        
+        Returns:
+            Response: The response the synchronous route would have given
+        """
+        with self._lock:
+            if job['response'] is None:
+                response = current_app.make_response(job['finalize'](job['result']))
+                job['response'] = (response.get_data(), response.status_code, list(response.headers))
+                job['finalize'] = None
+        
+        body, status, headers = job['response']
+        return current_app.response_class(body, status=status, headers=headers)
+
+
+def wants_async():
+    """True when the client asked for a job id instead of waiting (async=1)"""
+    data = request.get_json(silent=True) if request.is_json else request.form
+    flag = (data or {}).get('async') or request.args.get('async')
+    return str(flag).lower() in ('1', 'true')
+
+
+def run_or_enqueue(work, finalize):
+    """
+    Run work synchronously, or as a background job if the client asked for one
+    
+    Args:
+        work: Callable returning a service result dict
+        finalize: Callable turning that result into the route's response
+    
+    Returns:
+        Response: finalize(work()) or a 202 with the job id
+    """
+    if not wants_async():
+        return finalize(work())
+    
+    job_id = job_service.submit(work, finalize)
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'/jobs/{job_id}'
+    }), 202
+
+
+# Global service instance
+job_service = JobService()
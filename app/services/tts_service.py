@@ -1,32 +1,54 @@
 """
 Text-to-Speech service using OpenAI TTS
 """
-import openai
 from flask import current_app
 import os
+import json
+import logging
+import threading
 from pathlib import Path
+from app.utils.audio_cache import audio_cache
+from app.utils.languages import LANG_NAMES
+
+# HTTP/2 is used when the optional h2 package is installed
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 class TTSService:
     """Service for text-to-speech conversion"""
     
     def __init__(self):
         self.client = None
+        self._lock = threading.Lock()
     
     def init_client(self):
-        """Initialize OpenAI client with extended timeout"""
+        """
+        Initialize one OpenAI client with extended timeout
+        
+        The client keeps a pool of open connections to the API, so translate and
+        speech calls (including parallel dubbing chunks) reuse TLS sessions.
+        """
         if not self.client:
-            api_key = current_app.config['OPENAI_API_KEY']
-            if api_key:
-                openai.api_key = api_key
-                # Set timeout to 5 minutes for TTS generation
-                try:
-                    openai.timeout = 300
-                except:
-                    pass  # Old version may not support this
-                self.client = openai
+            with self._lock:
+                api_key = current_app.config['OPENAI_API_KEY']
+                if api_key and not self.client:
+                    # Imported on first use so app startup does not load the OpenAI stack
+                    from openai import OpenAI
+                    import httpx
+                    
+                    # Set timeout to 5 minutes for TTS generation
+                    http_client = httpx.Client(
+                        http2=HTTP2_AVAILABLE,
+                        timeout=300,
+                        limits=httpx.Limits(max_keepalive_connections=16, max_connections=32)
+                    )
+                    self.client = OpenAI(api_key=api_key, timeout=300, http_client=http_client)
         return self.client
     
-    def generate_speech(self, text, voice="alloy", output_path=None, translate_to=None):
+    def generate_speech(self, text, voice="alloy", output_path=None, translate_to=None, cache=True):
         """
         Generate speech from text
         
@@ -35,6 +57,8 @@ class TTSService:
             voice: Voice to use (alloy, echo, fable, onyx, nova, shimmer)
             output_path: Path to save audio file
             translate_to: Optional language to translate text to before speech
+            cache: Keep a small clip in memory for the follow-up GET (False for
+                   intermediate files that are never served, e.g. dubbing chunks)
         
         Returns:
             dict: Result with audio file path
@@ -67,8 +91,12 @@ class TTSService:
                 input=speech_text
             )
             
-            # Save to file
-            response.stream_to_file(output_path)
+            # Save to file and, if it will be served, keep small clips in memory for the follow-up GET
+            audio_data = response.content
+            with open(output_path, 'wb') as f:
+                f.write(audio_data)
+            if cache:
+                audio_cache.put(output_path, audio_data)
             
             return {
                 'success': True,
@@ -116,31 +144,30 @@ class TTSService:
         Translate text to target language using OpenAI
         
         Args:
-            text: Text to translate
+            text: Text to translate, or a list of texts to translate in one request
             target_language: Target language code or name
         
         Returns:
-            dict: Translation result
+            dict: Translation result ('translated_text', or 'translated_texts'
+                  in input order when a list was given)
         """
         try:
             client = self.init_client()
             
-            # Language code to name mapping
-            lang_names = {
-                'en': 'English',
-                'tr': 'Turkish',
-                'de': 'German',
-                'fr': 'French',
-                'es': 'Spanish',
-                'it': 'Italian',
-                'pt': 'Portuguese',
-                'ru': 'Russian',
-                'ja': 'Japanese',
-                'ko': 'Korean',
-                'zh': 'Chinese'
-            }
+            target_lang_name = LANG_NAMES.get(target_language, target_language)
             
-            target_lang_name = lang_names.get(target_language, target_language)
+            if isinstance(text, (list, tuple)):
+                texts = list(text)
+                try:
+                    batch_result = self._translate_batch(client, texts, target_lang_name)
+                except Exception as e:
+                    batch_result = {'success': False, 'error': str(e)}
+                if batch_result['success']:
+                    return batch_result
+                
+                # Wrong item count or invalid JSON: translate each text on its own
+                logging.warning(f"⚠️ Batch translation failed, translating {len(texts)} texts one by one: {batch_result['error']}")
+                return self._translate_each(texts, target_language)
             
             response = client.chat.completions.create(
                 model="gpt-3.5-turbo",
@@ -163,7 +190,67 @@ class TTSService:
                 'error': str(e)
             }
     
-    def generate_hd_speech(self, text, voice="alloy", output_path=None, translate_to=None):
+    def _translate_batch(self, client, texts, target_lang_name):
+        """
+        Translate several texts in a single chat completion
+        
+        Args:
+            client: OpenAI client
+            texts: List of texts to translate
+            target_lang_name: Target language name
+        
+        Returns:
+            dict: Translation result with 'translated_texts' in input order
+        """
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": f'You are a professional translator. Translate each string in the "texts" array to {target_lang_name}. Reply with a JSON object {{"translations": [...]}} holding the translations in the same order. No explanations.'},
+                {"role": "user", "content": json.dumps({'texts': texts}, ensure_ascii=False)}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.3
+        )
+        
+        translations = json.loads(response.choices[0].message.content).get('translations')
+        if not isinstance(translations, list) or len(translations) != len(texts):
+            return {
+                'success': False,
+                'error': 'Batch translation returned an unexpected number of texts'
+            }
+        
+        return {
+            'success': True,
+            'translated_texts': [str(t) for t in translations]
+        }
+    
+    def _translate_each(self, texts, target_language):
+        """
+        Translate texts with one request each (fallback for a failed batch)
+        
+        Args:
+            texts: List of texts to translate
+            target_language: Target language code or name
+        
+        Returns:
+            dict: Translation result with 'translated_texts' in input order; a text
+                  whose own request also fails is kept untranslated
+        """
+        translated_texts = []
+        for text in texts:
+            result = self.translate_text(text, target_language)
+            if result['success']:
+                translated_texts.append(result['translated_text'])
+            else:
+                logging.warning(f"⚠️ Translation failed, using original text: {result['error']}")
+                translated_texts.append(text)
+        
+        return {
+            'success': True,
+            'translated_texts': translated_texts
+        }
+    
+    def generate_hd_speech(self, text, voice="alloy", output_path=None, translate_to=None, cache=True):
         """
         Generate high-quality speech from text
         
@@ -172,6 +259,8 @@ class TTSService:
             voice: Voice to use
             output_path: Path to save audio file
             translate_to: Optional language to translate text to before speech
+            cache: Keep a small clip in memory for the follow-up GET (False for
+                   intermediate files that are never served, e.g. dubbing chunks)
         
         Returns:
             dict: Result with audio file path
@@ -202,7 +291,12 @@ class TTSService:
                 input=speech_text
             )
             
-            response.stream_to_file(output_path)
+            # Save to file and, if it will be served, keep small clips in memory for the follow-up GET
+            audio_data = response.content
+            with open(output_path, 'wb') as f:
+                f.write(audio_data)
+            if cache:
+                audio_cache.put(output_path, audio_data)
             
             return {
                 'success': True,
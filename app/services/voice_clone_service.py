@@ -2,18 +2,69 @@
 Voice cloning service using MiniMax API
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from requests_toolbelt import MultipartEncoder
 import base64
+import binascii
+import re
+import unicodedata
 from flask import current_app
 import os
 import json
-import subprocess
-import imageio_ffmpeg
+import logging
+import secrets
+import socket
+from io import BytesIO
+from app.utils.ffmpeg_utils import read_ffmpeg_output
+from app.utils.cache import TTLCache
+
+# orjson is optional; it parses the SSE event bytes several times faster
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Characters not allowed in a MiniMax voice_id, and runs of underscores
+_VOICE_NAME_CLEAN_RE = re.compile(r'[^a-zA-Z0-9_]')
+_UNDERSCORE_RE = re.compile(r'_+')
+# Turkish letters mapped to ASCII in one pass before the unicodedata fallback
+_ASCIIFY = str.maketrans({
+    'ç': 'c', 'ğ': 'g', 'ı': 'i', 'ö': 'o', 'ş': 's', 'ü': 'u',
+    'Ç': 'C', 'Ğ': 'G', 'İ': 'I', 'Ö': 'O', 'Ş': 'S', 'Ü': 'U'
+})
+
+# Extensions handled by extracting the audio track before upload
+_VIDEO_EXTENSIONS = frozenset({'.mp4', '.avi', '.mov', '.mkv', '.webm'})
+
+
+class _MiniMaxAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose pooled sockets keep urllib3's TCP_NODELAY and add SO_KEEPALIVE
+    
+    The receive buffer is left to the kernel: setting SO_RCVBUF explicitly
+    turns off Linux receive-window autotuning for the socket.
+    """
+    
+    SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    ]
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = self.SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
 
 class VoiceCloneService:
     """Service for voice cloning and custom voice management"""
     
     def __init__(self):
         self.base_url = "https://api.minimax.io/v1"
+        # One session so upload, clone and T2A calls reuse kept-alive TLS connections
+        self.session = requests.Session()
+        self.session.mount('https://', _MiniMaxAdapter(pool_connections=4, pool_maxsize=8))
+        # Voice lists keyed by (api_key, group_id); cleared whenever a voice is cloned or deleted
+        self._voices_cache = TTLCache(maxsize=16, ttl=30)
     
     def get_headers(self):
         """Get API headers"""
@@ -28,7 +79,9 @@ class VoiceCloneService:
         Fix duplicated audio by cutting it in half from the middle
         
         This addresses the issue where MiniMax API sometimes returns
-        duplicated audio content (same speech repeated twice)
+        duplicated audio content (same speech repeated twice). The file is
+        only cut when its two halves are byte-for-byte identical, so audio
+        that was not duplicated is left untouched.
         
         Args:
             audio_file_path: Path to the audio file to fix
@@ -37,90 +90,81 @@ class VoiceCloneService:
             str: Path to the fixed audio file, or original path if fixing failed
         """
         try:
-            print(f"🔧 Fixing duplicated audio: {os.path.basename(audio_file_path)}")
-            
-            # Get FFmpeg executable
-            ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
+            size = os.path.getsize(audio_file_path)
+            half_size = size // 2
             
-            # First, get the duration of the audio file
-            duration_cmd = [
-                ffmpeg_exe, 
-                '-i', audio_file_path,
-                '-f', 'null', '-'
-            ]
-            
-            result = subprocess.run(duration_cmd, capture_output=True, text=True)
-            duration_line = None
-            
-            # Parse duration from stderr (FFmpeg outputs info to stderr)
-            for line in result.stderr.split('\n'):
-                if 'Duration:' in line:
-                    duration_line = line
-                    break
-            
-            if not duration_line:
-                print(f"⚠️ Could not get audio duration, returning original file")
-                return audio_file_path
-            
-            # Extract duration in format "Duration: HH:MM:SS.ms"
-            import re
-            duration_match = re.search(r'Duration: (\d{2}):(\d{2}):(\d{2}\.\d{2})', duration_line)
-            if not duration_match:
-                print(f"⚠️ Could not parse duration, returning original file")
+            # A duplicated response is the same bytes twice, so its size is even
+            if size == 0 or size % 2:
                 return audio_file_path
             
-            hours, minutes, seconds = duration_match.groups()
-            total_seconds = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
-            
-            print(f"📏 Original audio duration: {total_seconds:.2f} seconds")
-            
-            # Calculate half duration
-            half_duration = total_seconds / 2
-            print(f"✂️ Cutting to first half: {half_duration:.2f} seconds")
-            
-            # Create output path
-            input_dir = os.path.dirname(audio_file_path)
-            input_name = os.path.splitext(os.path.basename(audio_file_path))[0]
-            fixed_path = os.path.join(input_dir, f"{input_name}_fixed.mp3")
-            
-            # Cut audio to first half using FFmpeg
-            cut_cmd = [
-                ffmpeg_exe,
-                '-i', audio_file_path,
-                '-t', str(half_duration),  # Duration to extract
-                '-acodec', 'copy',         # Copy audio codec (faster)
-                '-y',                      # Overwrite output
-                fixed_path
-            ]
-            
-            print(f"🏃 Running: {' '.join(cut_cmd[:3])} ... -t {half_duration:.2f} ... {os.path.basename(fixed_path)}")
-            
-            result = subprocess.run(cut_cmd, capture_output=True, text=True)
+            with open(audio_file_path, 'r+b') as f:
+                first_half = f.read(half_size)
+                if f.read() != first_half:
+                    return audio_file_path
+                
+                # Drop the repeated second half in place
+                print(f"🔧 Fixing duplicated audio: {os.path.basename(audio_file_path)}")
+                f.truncate(half_size)
             
-            if result.returncode != 0:
-                print(f"❌ FFmpeg cutting failed: {result.stderr}")
-                return audio_file_path
+            print(f"✅ Audio fixed successfully!")
+            print(f"  📏 Original: {size} bytes")
+            print(f"  📏 Fixed: {half_size} bytes")
             
-            # Check if fixed file was created and is valid
-            if os.path.exists(fixed_path) and os.path.getsize(fixed_path) > 0:
-                print(f"✅ Audio fixed successfully!")
-                print(f"  📏 Original: {os.path.getsize(audio_file_path)} bytes")
-                print(f"  📏 Fixed: {os.path.getsize(fixed_path)} bytes")
-                
-                # Replace original file with fixed one
-                os.remove(audio_file_path)
-                os.rename(fixed_path, audio_file_path)
-                print(f"🔄 Replaced original file with fixed version")
-                
-                return audio_file_path
-            else:
-                print(f"❌ Fixed file was not created or is empty")
-                return audio_file_path
+            return audio_file_path
                 
         except Exception as e:
             print(f"❌ Audio fixing error: {str(e)}")
             return audio_file_path
     
+    def _download_audio(self, audio_url, output_path):
+        """
+        Stream an audio file from a URL to disk without buffering it in memory
+        
+        Args:
+            audio_url: URL of the generated audio
+            output_path: Path to write the audio to
+            
+        Returns:
+            int: Number of bytes written
+        """
+        audio_size = 0
+        with self.session.get(audio_url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            with open(output_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=131072):
+                    audio_size += f.write(chunk)
+        return audio_size
+    
+    @staticmethod
+    def _decode_b64(audio_b64):
+        """Decode base64 audio from MiniMax, restoring any stripped '=' padding"""
+        data = audio_b64.encode('ascii')
+        data += b'=' * (-len(data) % 4)
+        return base64.b64decode(data)
+    
+    @staticmethod
+    def _strip_duplicated_audio(audio_data):
+        """
+        In-memory counterpart of fix_duplicated_audio
+        
+        Args:
+            audio_data: Audio bytes returned by MiniMax
+            
+        Returns:
+            bytes or memoryview: The first half if both halves are identical, else audio_data
+        """
+        half_size = len(audio_data) // 2
+        if not audio_data or len(audio_data) % 2:
+            return audio_data
+        
+        # Slicing a memoryview compares the halves without copying them
+        view = memoryview(audio_data)
+        if view[:half_size] != view[half_size:]:
+            return audio_data
+        
+        print(f"✅ Duplicated audio fixed: {len(audio_data)} -> {half_size} bytes")
+        return view[:half_size]
+    
     def clone_voice(self, audio_file_path, voice_name, voice_description=None):
         """
         Clone a voice from audio file using MiniMax API
@@ -147,123 +191,128 @@ class VoiceCloneService:
                     'error': 'MiniMax API key not configured'
                 }
             
-            # Step 1: Check if video file and extract audio
+            # Step 1: Upload source audio file
+            upload_url = f"{self.base_url}/files/upload"
             file_ext = os.path.splitext(audio_file_path)[1].lower()
             
-            # If video file, extract audio first
-            if file_ext in ['.mp4', '.avi', '.mov', '.mkv', '.webm']:
-                print(f"🎬 Video file detected, extracting audio...")
-                
-                # Extract audio using ffmpeg
-                import subprocess
-                import imageio_ffmpeg
-                
-                audio_output_path = audio_file_path.rsplit('.', 1)[0] + '_audio.mp3'
-                ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
-                
-                cmd = [
-                    ffmpeg_exe, '-i', audio_file_path, '-vn', '-acodec', 'libmp3lame',
-                    '-b:a', '192k', '-y', audio_output_path
-                ]
+            # If video file, extract its audio track before uploading
+            if file_ext in _VIDEO_EXTENSIONS:
+                print(f"🎬 Video file detected, extracting audio for MiniMax...")
                 
-                result = subprocess.run(cmd, capture_output=True, text=True)
-                if result.returncode != 0 or not os.path.exists(audio_output_path):
+                # The MP3 is kept in memory (a few MB for the 5 min limit) so the
+                # upload has a Content-Length and ffmpeg failures are caught
+                # before anything is sent
+                returncode, audio_data, stderr = read_ffmpeg_output([
+                    '-i', audio_file_path, '-vn', '-acodec', 'libmp3lame',
+                    '-b:a', '192k', '-f', 'mp3', 'pipe:1'
+                ])
+                if returncode != 0 or not audio_data:
                     return {
                         'success': False,
-                        'error': f'Failed to extract audio from video: {result.stderr}'
+                        'error': f'Failed to extract audio from video (ffmpeg exit code {returncode}): {stderr.strip()}'
                     }
                 
-                audio_file_path = audio_output_path
-                print(f"✅ Audio extracted to: {audio_file_path}")
-            
-            # Step 2: Upload source audio file
-            upload_url = f"{self.base_url}/files/upload"
-            
-            print(f"📤 Uploading file to MiniMax: {audio_file_path}")
-            
-            # Determine correct MIME type
-            file_ext = os.path.splitext(audio_file_path)[1].lower()
-            mime_types = {
-                '.mp3': 'audio/mpeg',
-                '.m4a': 'audio/mp4',
-                '.wav': 'audio/wav'
-            }
-            mime_type = mime_types.get(file_ext, 'audio/mpeg')
-            
-            with open(audio_file_path, 'rb') as f:
-                files = {
-                    'file': (os.path.basename(audio_file_path), f, mime_type)
-                }
-                data = {
-                    'purpose': 'voice_clone'
-                }
+                upload_name = os.path.basename(audio_file_path.rsplit('.', 1)[0] + '_audio.mp3')
+                upload_body = MultipartEncoder(fields={
+                    'purpose': 'voice_clone',
+                    'file': (upload_name, BytesIO(audio_data), 'audio/mpeg')
+                })
                 
-                upload_response = requests.post(
-                    upload_url, 
-                    headers={'Authorization': f'Bearer {api_key}'}, 
-                    data=data, 
-                    files=files,
+                upload_response = self.session.post(
+                    upload_url,
+                    headers={
+                        'Authorization': f'Bearer {api_key}',
+                        'Content-Type': upload_body.content_type
+                    },
+                    data=upload_body,
                     timeout=60
                 )
+            else:
+                print(f"📤 Uploading file to MiniMax: {audio_file_path}")
                 
-                print(f"📥 Upload response status: {upload_response.status_code}")
-                print(f"📄 Upload response text: {upload_response.text[:500]}")
-                
-                upload_response.raise_for_status()
-                
-                try:
-                    file_data = upload_response.json()
-                except Exception as json_error:
-                    return {
-                        'success': False,
-                        'error': f'Failed to parse upload response as JSON: {upload_response.text[:200]}'
-                    }
-                
-                if file_data is None:
-                    return {
-                        'success': False,
-                        'error': f'Upload response is None. Raw response: {upload_response.text[:200]}'
-                    }
-                
-                # Try different response structures
-                file_id = None
-                if isinstance(file_data, dict):
-                    file_id = (file_data.get('file', {}).get('file_id') or 
-                              file_data.get('file_id') or 
-                              file_data.get('data', {}).get('file_id'))
-                
-                print(f"🆔 Extracted file_id: {file_id}")
+                # Determine correct MIME type
+                mime_types = {
+                    '.mp3': 'audio/mpeg',
+                    '.m4a': 'audio/mp4',
+                    '.wav': 'audio/wav'
+                }
+                mime_type = mime_types.get(file_ext, 'audio/mpeg')
                 
-                if not file_id:
-                    return {
-                        'success': False,
-                        'error': f'Failed to get file_id from upload response: {file_data}'
-                    }
+                with open(audio_file_path, 'rb') as f:
+                    # Stream the multipart body from the file instead of building it in memory
+                    upload_body = MultipartEncoder(fields={
+                        'purpose': 'voice_clone',
+                        'file': (os.path.basename(audio_file_path), f, mime_type)
+                    })
+                    
+                    upload_response = self.session.post(
+                        upload_url, 
+                        headers={
+                            'Authorization': f'Bearer {api_key}',
+                            'Content-Type': upload_body.content_type
+                        }, 
+                        data=upload_body,
+                        timeout=60
+                    )
+            
+            # Raw response dumps only reach the log in debug mode
+            current_app.logger.debug("📥 Upload response status: %s", upload_response.status_code)
+            current_app.logger.debug("📄 Upload response text: %.500s", upload_response.text)
+            
+            upload_response.raise_for_status()
+            
+            try:
+                file_data = upload_response.json()
+            except Exception as json_error:
+                return {
+                    'success': False,
+                    'error': f'Failed to parse upload response as JSON: {upload_response.text[:200]}'
+                }
             
-            # Step 3: Clone the voice
+            if file_data is None:
+                return {
+                    'success': False,
+                    'error': f'Upload response is None. Raw response: {upload_response.text[:200]}'
+                }
+            
+            # Try different response structures
+            file_id = None
+            if isinstance(file_data, dict):
+                file_id = (file_data.get('file', {}).get('file_id') or 
+                          file_data.get('file_id') or 
+                          file_data.get('data', {}).get('file_id'))
+            
+            print(f"🆔 Extracted file_id: {file_id}")
+            
+            if not file_id:
+                return {
+                    'success': False,
+                    'error': f'Failed to get file_id from upload response: {file_data}'
+                }
+            
+            # Step 2: Clone the voice
             clone_url = f"{self.base_url}/voice_clone"
             
             # Generate unique voice_id from voice_name
             # Remove special characters and non-ASCII characters (Turkish chars, etc.)
-            import re
-            import unicodedata
-            
-            # Normalize and remove accents/diacritics
-            voice_name_normalized = unicodedata.normalize('NFKD', voice_name)
-            voice_name_ascii = voice_name_normalized.encode('ASCII', 'ignore').decode('ASCII')
+            # Map Turkish letters directly; normalize away other accents/diacritics only if any remain
+            voice_name_ascii = voice_name.translate(_ASCIIFY)
+            if not voice_name_ascii.isascii():
+                voice_name_normalized = unicodedata.normalize('NFKD', voice_name_ascii)
+                voice_name_ascii = voice_name_normalized.encode('ASCII', 'ignore').decode('ASCII')
             
             # Keep only alphanumeric and underscores
-            voice_name_clean = re.sub(r'[^a-zA-Z0-9_]', '_', voice_name_ascii.lower())
+            voice_name_clean = _VOICE_NAME_CLEAN_RE.sub('_', voice_name_ascii.lower())
             
             # Remove consecutive underscores and leading/trailing underscores
-            voice_name_clean = re.sub(r'_+', '_', voice_name_clean).strip('_')
+            voice_name_clean = _UNDERSCORE_RE.sub('_', voice_name_clean).strip('_')
             
             # Generate unique voice_id
-            voice_id = f"{voice_name_clean}_{os.urandom(4).hex()}"
+            voice_id = f"{voice_name_clean}_{secrets.token_hex(4)}"
             
             # Ensure voice_id is not empty
             if not voice_name_clean:
-                voice_id = f"voice_{os.urandom(6).hex()}"
+                voice_id = f"voice_{secrets.token_hex(6)}"
 
             print(f"🎤 Cloning voice with ID: {voice_id}")
             
@@ -279,15 +328,15 @@ class VoiceCloneService:
                 'Content-Type': 'application/json'
             }
             
-            clone_response = requests.post(
+            clone_response = self.session.post(
                 clone_url,
                 headers=clone_headers,
                 json=clone_payload,
                 timeout=120
             )
 
-            print(f"📥 Clone response status: {clone_response.status_code}")
-            print(f"📄 Clone response body: {clone_response.text}")
+            current_app.logger.debug("📥 Clone response status: %s", clone_response.status_code)
+            current_app.logger.debug("📄 Clone response body: %s", clone_response.text)
 
             clone_response.raise_for_status()
             
@@ -313,6 +362,9 @@ class VoiceCloneService:
 
             print(f"✅ Voice cloned successfully: {voice_id}")
             
+            # The cached voice lists no longer include the new voice
+            self._voices_cache.clear()
+            
             return {
                 'success': True,
                 'voice_id': voice_id,
@@ -381,7 +433,7 @@ class VoiceCloneService:
             if not output_path:
                 temp_folder = os.path.abspath(current_app.config['TEMP_FOLDER'])
                 os.makedirs(temp_folder, exist_ok=True)
-                output_path = os.path.join(temp_folder, f"cloned_speech_{os.urandom(8).hex()}.mp3")
+                output_path = os.path.join(temp_folder, f"cloned_speech_{secrets.token_hex(8)}.mp3")
             
             # MiniMax T2A API - Try both sync endpoints
             # /t2a_v2 returns base64 (might be incomplete)
@@ -418,72 +470,70 @@ class VoiceCloneService:
             }
             
             print(f"🔊 Calling MiniMax T2A: {url}")
-            print(f"📦 Payload: {payload}")
+            current_app.logger.debug("📦 Payload: %s", payload)
             
             try:
-                response = requests.post(url, headers=headers, json=payload, timeout=60, stream=True)
+                response = self.session.post(url, headers=headers, json=payload, timeout=60, stream=True)
                 response.raise_for_status()
                 
                 # Check content type
                 content_type = response.headers.get('Content-Type', '')
-                print(f"📦 Response Content-Type: {content_type}")
+                current_app.logger.debug("📦 Response Content-Type: %s", content_type)
                 
                 # If Server-Sent Events (SSE)
                 if 'text/event-stream' in content_type:
                     print("📦 Receiving SSE stream...")
-                    audio_data = b""
+                    audio_size = 0
                     
-                    for line in response.iter_lines(decode_unicode=True):
-                        if line:
-                            print(f"📦 SSE Line: {line[:100]}...")
-                            
-                            # SSE format: "data: {...}"
-                            if line.startswith('data: '):
-                                json_str = line[6:]  # Remove "data: "
-                                try:
-                                    event_data = json.loads(json_str)
-                                    
-                                    # Look for audio data in SSE events
-                                    if 'data' in event_data and 'audio' in event_data['data']:
-                                        audio_chunk = event_data['data']['audio']
-                                        # Convert hex to bytes
-                                        audio_bytes = bytes.fromhex(audio_chunk)
-                                        audio_data += audio_bytes
-                                        print(f"📦 Got audio chunk: {len(audio_bytes)} bytes")
-                                    
-                                    # Check if final
-                                    if event_data.get('is_final'):
-                                        print(f"✅ Final SSE event received")
-                                        break
+                    # Decoded chunks go straight to disk instead of a growing buffer
+                    with open(output_path, 'wb') as f:
+                        # 64 KB reads instead of the 512-byte default; no per-line logging
+                        # Lines stay bytes: the JSON parser and unhexlify both accept them
+                        for line in response.iter_lines(chunk_size=65536, decode_unicode=False):
+                            if line:
+                                # SSE format: "data: {...}"
+                                if line.startswith(b'data: '):
+                                    json_str = line[6:]  # Remove "data: "
+                                    try:
+                                        event_data = _json_loads(json_str)
                                         
-                                except json.JSONDecodeError:
-                                    continue
+                                        # Look for audio data in SSE events
+                                        if 'data' in event_data and 'audio' in event_data['data']:
+                                            audio_chunk = event_data['data']['audio']
+                                            # Convert hex to bytes
+                                            audio_size += f.write(binascii.unhexlify(audio_chunk))
+                                        
+                                        # Check if final
+                                        if event_data.get('is_final'):
+                                            print(f"✅ Final SSE event received")
+                                            break
+                                            
+                                    except json.JSONDecodeError:
+                                        continue
                     
-                    if audio_data:
-                        print(f"✅ Total audio: {len(audio_data)} bytes")
-                        with open(output_path, 'wb') as f:
-                            f.write(audio_data)
+                    if audio_size:
+                        print(f"✅ Total audio: {audio_size} bytes")
                         
                         # Fix duplicated audio by cutting in half
                         fixed_path = self.fix_duplicated_audio(output_path)
                         
                         return {'success': True, 'audio_path': fixed_path}
                     else:
+                        os.remove(output_path)
                         return {'success': False, 'error': 'No audio data in SSE stream'}
                 
                 # If streaming audio (binary)
                 elif 'audio' in content_type or 'octet-stream' in content_type:
                     print("📦 Receiving binary audio stream...")
-                    audio_data = b""
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            audio_data += chunk
-                    
-                    print(f"✅ Downloaded {len(audio_data)} bytes from binary stream")
+                    audio_size = 0
                     
-                    # Save directly
+                    # Save directly, chunk by chunk
                     with open(output_path, 'wb') as f:
-                        f.write(audio_data)
+                        for chunk in response.iter_content(chunk_size=131072):
+                            if chunk:
+                                audio_size += f.write(chunk)
+                    
+                    print(f"✅ Downloaded {audio_size} bytes from binary stream")
                     
                     # Fix duplicated audio by cutting in half
                     fixed_path = self.fix_duplicated_audio(output_path)
@@ -514,21 +564,24 @@ class VoiceCloneService:
                         }
                 
                 print(f"✅ TTS Success!")
-                print(f"📦 Full Response Keys: {result.keys()}")
-                if 'data' in result:
-                    print(f"📦 Data Keys: {result['data'].keys()}")
-                    if 'audio' in result['data']:
-                        audio_len = len(result['data']['audio'])
-                        print(f"📦 Base64 audio length: {audio_len} characters")
-                    if 'audio_url' in result['data']:
-                        print(f"📦 Audio URL found: {result['data']['audio_url']}")
-                if 'extra_info' in result:
-                    print(f"📦 Extra Info Keys: {result['extra_info'].keys()}")
-                    if 'audio_url' in result['extra_info']:
-                        print(f"📦 Audio URL in extra_info: {result['extra_info']['audio_url']}")
-                    else:
-                        print(f"📦 No audio_url in extra_info")
-                    print(f"📦 Expected audio size: {result['extra_info'].get('audio_size', 'unknown')} bytes")
+                
+                # Response structure dump, only built when debug logging is on
+                logger = current_app.logger
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("📦 Full Response Keys: %s", result.keys())
+                    if 'data' in result:
+                        logger.debug("📦 Data Keys: %s", result['data'].keys())
+                        if 'audio' in result['data']:
+                            logger.debug("📦 Base64 audio length: %d characters", len(result['data']['audio']))
+                        if 'audio_url' in result['data']:
+                            logger.debug("📦 Audio URL found: %s", result['data']['audio_url'])
+                    if 'extra_info' in result:
+                        logger.debug("📦 Extra Info Keys: %s", result['extra_info'].keys())
+                        if 'audio_url' in result['extra_info']:
+                            logger.debug("📦 Audio URL in extra_info: %s", result['extra_info']['audio_url'])
+                        else:
+                            logger.debug("📦 No audio_url in extra_info")
+                        logger.debug("📦 Expected audio size: %s bytes", result['extra_info'].get('audio_size', 'unknown'))
                 
             except requests.exceptions.RequestException as e:
                 error_msg = str(e)
@@ -547,79 +600,66 @@ class VoiceCloneService:
                     'error': f'Speech generation failed: {str(e)}'
                 }
             
-            # MiniMax T2A returns audio data in various formats
-            # Priority: audio_url > base64 audio
-            audio_data = None
-
-            # Format 1: Audio URL in data (PREFERRED - always works)
-            if 'data' in result and 'audio_url' in result['data']:
-                print("📦 Using audio_url from data")
-                audio_url = result['data']['audio_url']
-                audio_response = requests.get(audio_url, timeout=30)
-                audio_response.raise_for_status()
-                audio_data = audio_response.content
-                print(f"✅ Downloaded {len(audio_data)} bytes from URL")
-            # Format 2: Audio URL in extra_info
-            elif 'extra_info' in result and 'audio_url' in result['extra_info']:
-                print("📦 Using audio_url from extra_info")
-                audio_url = result['extra_info']['audio_url']
-                audio_response = requests.get(audio_url, timeout=30)
-                audio_response.raise_for_status()
-                audio_data = audio_response.content
-                print(f"✅ Downloaded {len(audio_data)} bytes from URL")
-            # Format 3: Base64 audio in data.audio
-            elif 'data' in result and 'audio' in result['data']:
-                print("📦 Using base64 audio from data.audio")
-                try:
-                    audio_b64 = result['data']['audio']
-                    # Add padding if needed
-                    missing_padding = len(audio_b64) % 4
-                    if missing_padding:
-                        audio_b64 += '=' * (4 - missing_padding)
-                    audio_data = base64.b64decode(audio_b64)
-                    print(f"✅ Decoded {len(audio_data)} bytes from base64")
-                except Exception as e:
-                    print(f"❌ Base64 decode failed: {e}")
+            # MiniMax T2A JSON responses are expected to carry an audio_url,
+            # either in data or in extra_info
+            data = result.get('data')
+            audio_url = None
+            if isinstance(data, dict):
+                audio_url = data.get('audio_url')
+            if not audio_url and isinstance(result.get('extra_info'), dict):
+                audio_url = result['extra_info'].get('audio_url')
+            
+            # URL audio is streamed straight to the output file
+            if audio_url:
+                audio_size = self._download_audio(audio_url, output_path)
+                print(f"✅ Downloaded {audio_size} bytes from URL")
+                
+                if audio_size < 100:
+                    os.remove(output_path)
                     return {
                         'success': False,
-                        'error': f'Failed to decode audio: {str(e)}'
+                        'error': f'Audio data too short or empty: {audio_size} bytes'
                     }
-            # Format 4: Direct base64 audio
+                
+                # Fix duplicated audio by cutting in half
+                fixed_path = self.fix_duplicated_audio(output_path)
+                
+                return {
+                    'success': True,
+                    'audio_path': fixed_path
+                }
+            
+            # Base64 audio (a third larger plus a decode pass) is only accepted for debugging
+            if not current_app.config.get('ALLOW_B64_AUDIO', False):
+                print(f"⚠️ No audio_url in MiniMax response, base64 audio is disabled")
+                return {
+                    'success': False,
+                    'error': f'No audio URL found in response. Keys: {list(result.keys())}'
+                }
+            
+            # Base64 audio in data.audio, top-level audio, or data itself
+            if isinstance(data, dict) and 'audio' in data:
+                audio_b64 = data['audio']
             elif 'audio' in result:
-                print("📦 Using direct base64 audio")
-                try:
-                    audio_b64 = result['audio']
-                    missing_padding = len(audio_b64) % 4
-                    if missing_padding:
-                        audio_b64 += '=' * (4 - missing_padding)
-                    audio_data = base64.b64decode(audio_b64)
-                    print(f"✅ Decoded {len(audio_data)} bytes from base64")
-                except Exception as e:
-                    return {
-                        'success': False,
-                        'error': f'Failed to decode audio: {str(e)}'
-                    }
-            # Format 5: Base64 string directly in data
-            elif 'data' in result and isinstance(result['data'], str):
-                print("📦 Using base64 string from data")
-                try:
-                    audio_b64 = result['data']
-                    missing_padding = len(audio_b64) % 4
-                    if missing_padding:
-                        audio_b64 += '=' * (4 - missing_padding)
-                    audio_data = base64.b64decode(audio_b64)
-                    print(f"✅ Decoded {len(audio_data)} bytes from base64")
-                except Exception as e:
-                    return {
-                        'success': False,
-                        'error': f'Failed to decode audio: {str(e)}'
-                    }
+                audio_b64 = result['audio']
+            elif isinstance(data, str):
+                audio_b64 = data
             else:
                 return {
                     'success': False,
                     'error': f'No audio found in response. Keys: {list(result.keys())}'
                 }
             
+            try:
+                audio_data = self._decode_b64(audio_b64)
+                print(f"✅ Decoded {len(audio_data)} bytes from base64")
+            except Exception as e:
+                print(f"❌ Base64 decode failed: {e}")
+                return {
+                    'success': False,
+                    'error': f'Failed to decode audio: {str(e)}'
+                }
+            
             # Verify we have audio data
             if not audio_data or len(audio_data) < 100:
                 return {
@@ -627,16 +667,16 @@ class VoiceCloneService:
                     'error': f'Audio data too short or empty: {len(audio_data) if audio_data else 0} bytes'
                 }
             
+            # Fix duplicated audio in memory so the file is written once
+            audio_data = self._strip_duplicated_audio(audio_data)
+            
             # Write audio to file
             with open(output_path, 'wb') as f:
                 f.write(audio_data)
             
-            # Fix duplicated audio by cutting in half
-            fixed_path = self.fix_duplicated_audio(output_path)
-            
             return {
                 'success': True,
-                'audio_path': fixed_path
+                'audio_path': output_path
             }
             
         except requests.exceptions.RequestException as e:
@@ -673,11 +713,19 @@ class VoiceCloneService:
                     'error': 'MiniMax API key not configured'
                 }
             
+            cache_key = (api_key, group_id)
+            cached = self._voices_cache.get(cache_key)
+            if cached is not None:
+                return {
+                    'success': True,
+                    'voices': cached
+                }
+            
             # MiniMax voices list endpoint
             url = f"{self.base_url}/voices"
             params = {'group_id': group_id} if group_id else {}
             
-            response = requests.get(url, headers=self.get_headers(), params=params, timeout=30)
+            response = self.session.get(url, headers=self.get_headers(), params=params, timeout=30)
             response.raise_for_status()
             
             result = response.json()
@@ -694,6 +742,8 @@ class VoiceCloneService:
                     'preview_url': voice.get('preview_url')
                 })
             
+            self._voices_cache.set(cache_key, cloned_voices)
+            
             return {
                 'success': True,
                 'voices': cloned_voices
@@ -721,6 +771,7 @@ class VoiceCloneService:
             # The voice will be removed from session in the route handler
             
             print(f"🗑️ Deleting voice from session: {voice_id}")
+            self._voices_cache.clear()
             
             # Note: If MiniMax adds a delete endpoint later, it would be:
             # DELETE /v1/voice_clone/{voice_id} or similar
@@ -1,61 +1,440 @@
 """
 OpenAI Whisper Speech-to-Text service
 """
-import openai
 from flask import current_app
+from concurrent.futures import ThreadPoolExecutor
 import os
-import mimetypes
+import csv
+import io
+import glob
+import hashlib
 import logging
-import subprocess
-import imageio_ffmpeg
+import secrets
+import threading
+from app.utils.cache import TTLCache
+from app.utils.ffmpeg_utils import run_ffmpeg, read_ffmpeg_output, probe_duration
+from app.utils.file_utils import schedule_cleanup
+from app.utils.languages import LANG_NAMES
+
+# PyAV reads durations in-process; otherwise ffmpeg_utils.probe_duration is used
+try:
+    import av
+except ImportError:
+    av = None
+
+# faster-whisper is optional; when installed, short clips are transcribed locally
+try:
+    from faster_whisper import WhisperModel
+except ImportError:
+    WhisperModel = None
+
+logger = logging.getLogger(__name__)
+
+# Audio is hashed in blocks of this size for the transcript cache key
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+# First two bytes of an MPEG audio frame (MPEG-1, MPEG-2, MPEG-2.5 Layer III)
+_MP3_FRAME_SYNCS = (b'\xff\xfb', b'\xff\xf3', b'\xff\xf2')
+
+# (offset, magic bytes, format) checked against the start of an upload
+_MAGIC = (
+    (0, b'ID3', 'mp3'),
+    (0, b'\xff\xfb', 'mp3'),
+    (0, b'\xff\xf3', 'mp3'),
+    (0, b'\xff\xf2', 'mp3'),
+    (8, b'WAVE', 'wav'),
+    (0, b'fLaC', 'flac'),
+    (0, b'OggS', 'ogg'),
+    (4, b'ftyp', 'mp4'),
+    (0, b'\x1aE\xdf\xa3', 'webm')
+)
+
+
+def _detect_format(header):
+    """Container format named by the file's magic bytes, or None if unrecognized"""
+    for offset, magic, detected_format in _MAGIC:
+        if header.startswith(magic, offset):
+            return detected_format
+    return None
+
+
+# File formats accepted by the OpenAI transcription API
+OPENAI_FORMATS = frozenset({'.flac', '.m4a', '.mp3', '.mp4', '.mpeg', '.mpga', '.oga', '.ogg', '.wav', '.webm'})
+
+# Content type for each OpenAI-accepted extension (logged and returned by validate_audio_file)
+_MIME_BY_EXT = {
+    '.flac': 'audio/flac',
+    '.m4a': 'audio/mp4',
+    '.mp3': 'audio/mpeg',
+    '.mp4': 'audio/mp4',
+    '.mpeg': 'audio/mpeg',
+    '.mpga': 'audio/mpeg',
+    '.oga': 'audio/ogg',
+    '.ogg': 'audio/ogg',
+    '.wav': 'audio/wav',
+    '.webm': 'audio/webm',
+}
+
+
+def _translation_prompt(target_lang_name):
+    """System prompt asking for a plain translation into target_lang_name"""
+    return f"You are a professional translator. Translate the following text to {target_lang_name}. Only provide the translation, no explanations."
+
+
+# Prompts for the known languages, built once
+_SYS_PROMPTS = {code: _translation_prompt(name) for code, name in LANG_NAMES.items()}
+
+
+def _response_text(response):
+    """Transcript from a transcription response (a plain str for response_format='text')"""
+    text = response if isinstance(response, str) else response.text
+    return text.strip()
+
+
+def _probe_duration(path):
+    """Audio duration in seconds from the container header, or None if unknown"""
+    try:
+        if av is not None:
+            with av.open(path) as container:
+                return container.duration / av.time_base if container.duration else None
+        return probe_duration(path)
+    except Exception as e:
+        logger.debug("⚠️ Could not read audio duration: %s", str(e))
+        return None
+
+
+def _scan_file(f, compute_hash=False, header_size=32):
+    """
+    Read an upload's size, header and (optionally) content hash in one pass
+    
+    Args:
+        f: Binary file object positioned at the start
+        compute_hash: Hash the whole file with BLAKE2b; otherwise only the header is read
+        header_size: Number of leading bytes to return
+    
+    Returns:
+        tuple: (size in bytes, header bytes, hex digest or None)
+    """
+    size = os.fstat(f.fileno()).st_size
+    if not compute_hash:
+        return size, f.read(header_size), None
+    
+    digest = hashlib.blake2b(digest_size=20)
+    block = f.read(_HASH_BLOCK_SIZE)
+    header = block[:header_size]
+    while block:
+        digest.update(block)
+        block = f.read(_HASH_BLOCK_SIZE)
+    return size, header, digest.hexdigest()
+
 
 class WhisperService:
     """Service for speech-to-text conversion using OpenAI Whisper"""
     
     def __init__(self):
         self.client = None
+        # Transcript cache, created from app config on first use (False = disabled)
+        self._cache = None
+        # Parallel chunk transcription and translation, sized from config on first use
+        self._executor = None
+        # Local faster-whisper model, loaded on first use (False = failed to load)
+        self._local_model = None
+        self._lock = threading.Lock()
+        # Loading the model is slow; keep it off the lock used for the cache and executor
+        self._local_model_lock = threading.Lock()
     
     def init_client(self):
-        """Initialize OpenAI client with extended timeout"""
+        """
+        Initialize one OpenAI client with extended timeout
+        
+        The client keeps a pool of open connections to the API, so repeated and
+        parallel (chunked) transcriptions reuse TCP/TLS sessions.
+        """
         if not self.client:
-            api_key = current_app.config['OPENAI_API_KEY']
-            if api_key:
-                openai.api_key = api_key
-                # Set timeout to 5 minutes for large file processing
-                try:
-                    openai.timeout = 300
-                except:
-                    pass  # Old version may not support this
-                self.client = openai
+            with self._lock:
+                api_key = current_app.config['OPENAI_API_KEY']
+                if api_key and not self.client:
+                    # Imported on first use so app startup does not load the OpenAI stack
+                    from openai import OpenAI
+                    import httpx
+                    
+                    # Set timeout to 5 minutes for large file processing
+                    http_client = httpx.Client(
+                        timeout=httpx.Timeout(300.0, connect=10.0),
+                        limits=httpx.Limits(
+                            max_keepalive_connections=32,
+                            max_connections=64,
+                            keepalive_expiry=60.0
+                        )
+                    )
+                    self.client = OpenAI(api_key=api_key, timeout=300, http_client=http_client)
         return self.client
     
-    def validate_audio_file(self, audio_file_path):
+    def _get_cache(self):
+        """Create the transcript cache from app config on first use"""
+        if self._cache is None:
+            with self._lock:
+                if self._cache is None:
+                    config = current_app.config
+                    if config.get('WHISPER_CACHE_ENABLED', True):
+                        self._cache = TTLCache(
+                            maxsize=config.get('WHISPER_CACHE_SIZE', 256),
+                            ttl=config.get('WHISPER_CACHE_TTL', 24 * 3600)
+                        )
+                    else:
+                        self._cache = False
+        return self._cache if self._cache is not False else None
+    
+    def _cache_key(self, validation, language, response_format):
+        """
+        Build a transcript cache key from the audio content and request options
+        
+        Args:
+            validation: Result of validate_audio_file (carries the content hash)
+            language: Language hint sent to Whisper
+            response_format: Kind of result being cached
+            
+        Returns:
+            tuple: Cache key, or None when caching is disabled
+        """
+        content_hash = validation.get('content_hash')
+        if content_hash is None or self._get_cache() is None:
+            return None
+        return (content_hash, language, response_format)
+    
+    def _get_cached(self, key):
+        """Return a cached transcription result, or None"""
+        cache = self._get_cache()
+        if key is None or cache is None:
+            return None
+        return cache.get(key)
+    
+    def _put_cached(self, key, result):
+        """Store a transcription result under key"""
+        cache = self._get_cache()
+        if key is not None and cache is not None:
+            cache.set(key, result)
+    
+    def _get_executor(self):
+        """Create the chunk transcription/translation worker pool from app config on first use"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=current_app.config['WHISPER_CHUNK_WORKERS'],
+                        thread_name_prefix='whisper-chunk'
+                    )
+        return self._executor
+    
+    def _get_local_model(self):
+        """
+        Load the faster-whisper model once per process
+        
+        Returns:
+            WhisperModel: The model, or None if it failed to load (not retried)
+        """
+        if self._local_model is None:
+            with self._local_model_lock:
+                if self._local_model is None:
+                    try:
+                        self._local_model = WhisperModel(
+                            current_app.config['LOCAL_WHISPER_MODEL'],
+                            device='auto',
+                            compute_type='int8'
+                        )
+                    except Exception as e:
+                        logger.warning("⚠️ Local Whisper model failed to load, using the API: %s", str(e))
+                        self._local_model = False
+        return self._local_model or None
+    
+    def _audio_duration(self, audio_file_path, validation):
+        """
+        Header duration of a validated file, probed at most once per validation
+        
+        Args:
+            audio_file_path: Path to audio file
+            validation: Result of validate_audio_file; the duration is stored in it
+            
+        Returns:
+            float: Duration in seconds, or None if unknown
+        """
+        if 'duration' not in validation:
+            validation['duration'] = _probe_duration(audio_file_path)
+        return validation['duration']
+    
+    def _local_transcribe(self, audio_file_path, validation, language, beam_size=None,
+                          condition_on_previous_text=None):
+        """
+        Transcribe a short clip with the local faster-whisper model
+        
+        Args:
+            audio_file_path: Path to audio file
+            validation: Result of validate_audio_file (size and duration)
+            language: Optional language code (None = auto-detect)
+            beam_size: Optional decoding beam size (1 = greedy)
+            condition_on_previous_text: Optional flag; False decodes each window independently
+            
+        Returns:
+            tuple: Transcript parts, or None when the clip is too long, the model
+                   is not available, or local transcription failed
+        """
+        max_seconds = current_app.config['LOCAL_WHISPER_MAX_SEC']
+        # A model that failed to load is not retried, and no duration probe is needed
+        if WhisperModel is None or max_seconds <= 0 or self._local_model is False:
+            return None
+        
+        duration = self._audio_duration(audio_file_path, validation)
+        if duration is None or duration > max_seconds:
+            return None
+        
+        model = self._get_local_model()
+        if model is None:
+            return None
+        
+        try:
+            options = {}
+            if beam_size is not None:
+                options['beam_size'] = beam_size
+            if condition_on_previous_text is not None:
+                options['condition_on_previous_text'] = condition_on_previous_text
+            
+            logger.debug("🖥️ Transcribing %.1fs clip locally", duration)
+            segments, _ = model.transcribe(audio_file_path, language=language, **options)
+            return (' '.join(segment.text.strip() for segment in segments),)
+        except Exception as e:
+            logger.warning("⚠️ Local transcription failed, using the API: %s", str(e))
+            return None
+    
+    def _segment_audio(self, audio_file_path, validation):
+        """
+        Split long audio into fixed-length chunks without re-encoding
+        
+        Args:
+            audio_file_path: Path to audio file
+            validation: Result of validate_audio_file (size and duration)
+            
+        Returns:
+            list: (chunk path, start offset in seconds) tuples, or None when
+                  the file is sent in one request
+        """
+        config = current_app.config
+        if validation['file_size'] < config['WHISPER_CHUNK_MIN_BYTES']:
+            return None
+        
+        # Audio that fits in one chunk is not worth an ffmpeg run
+        duration = self._audio_duration(audio_file_path, validation)
+        if duration is not None and duration <= config['WHISPER_CHUNK_SECONDS']:
+            return None
+        
+        base, ext = os.path.splitext(audio_file_path)
+        prefix = f"{base}_chunk{secrets.token_hex(4)}"
+        list_path = f"{prefix}.csv"
+        
+        args = [
+            '-i', audio_file_path,
+            '-vn', '-c', 'copy',
+            '-f', 'segment',
+            '-segment_time', str(config['WHISPER_CHUNK_SECONDS']),
+            '-reset_timestamps', '1',
+            # Lists each chunk with its actual start time (cuts land on packet boundaries)
+            '-segment_list', list_path,
+            '-segment_list_type', 'csv',
+            f"{prefix}_%03d{ext}"
+        ]
+        returncode, stderr_tail = run_ffmpeg(args)
+        
+        chunks = []
+        if returncode == 0:
+            chunk_dir = os.path.dirname(audio_file_path)
+            try:
+                with open(list_path, newline='') as f:
+                    for row in csv.reader(f):
+                        chunks.append((os.path.join(chunk_dir, os.path.basename(row[0])), float(row[1])))
+            except FileNotFoundError:
+                logger.warning("⚠️ Audio segmentation wrote no chunk list, sending whole file")
+        else:
+            logger.warning("⚠️ Audio segmentation failed, sending whole file: %s", stderr_tail)
+        
+        try:
+            os.remove(list_path)
+        except FileNotFoundError:
+            pass
+        
+        if len(chunks) < 2:
+            for chunk_path in glob.glob(glob.escape(prefix) + '_*'):
+                os.remove(chunk_path)
+            return None
+        
+        logger.debug("✂️ Split audio into %s chunks for parallel transcription", len(chunks))
+        return chunks
+    
+    def _transcribe_chunks(self, client, chunks, params):
+        """
+        Transcribe audio chunks in parallel, in order
+        
+        Args:
+            client: OpenAI client
+            chunks: (chunk path, start offset) tuples from _segment_audio
+            params: Request parameters shared by every chunk (without file)
+            
+        Returns:
+            list: (API response, start offset) tuples in chunk order
+        """
+        def transcribe(chunk):
+            chunk_path, offset = chunk
+            with open(chunk_path, 'rb') as audio_file:
+                return client.audio.transcriptions.create(file=audio_file, **params), offset
+        
+        try:
+            return list(self._get_executor().map(transcribe, chunks))
+        finally:
+            for chunk_path, _ in chunks:
+                schedule_cleanup(chunk_path)
+    
+    @staticmethod
+    def _offset_words(words, offset):
+        """Shift chunk-relative word timestamps to positions in the whole file"""
+        shifted = []
+        for word in words or []:
+            if not isinstance(word, dict):
+                word = {'word': word.word, 'start': word.start, 'end': word.end}
+            shifted.append({**word, 'start': word['start'] + offset, 'end': word['end'] + offset})
+        return shifted
+    
+    def validate_audio_file(self, audio_file_path, compute_hash=False, keep_open=False):
         """
         Validate audio file before sending to API
         
         Args:
             audio_file_path: Path to audio file
+            compute_hash: Also hash the whole file (for the transcript cache key)
+                          in the same pass that reads the header
+            keep_open: Return the open file (rewound) as 'file' when valid, so the
+                       upload does not reopen it; the caller must close it
             
         Returns:
             dict: Validation result with details
         """
+        audio_file = None
         try:
-            if not os.path.exists(audio_file_path):
+            # Get file info: one open gives the size, the header bytes and optionally the hash
+            try:
+                audio_file = open(audio_file_path, 'rb')
+            except FileNotFoundError:
                 return {
                     'valid': False,
                     'error': f'File does not exist: {audio_file_path}'
                 }
+            file_size, header, content_hash = _scan_file(audio_file, compute_hash)
             
-            # Get file info
-            file_size = os.path.getsize(audio_file_path)
             file_ext = os.path.splitext(audio_file_path)[1].lower()
-            mime_type, _ = mimetypes.guess_type(audio_file_path)
+            mime_type = _MIME_BY_EXT.get(file_ext, 'application/octet-stream')
             
-            logging.info(f"🔍 Audio file validation:")
-            logging.info(f"  📄 File: {os.path.basename(audio_file_path)}")
-            logging.info(f"  📏 Size: {file_size} bytes ({file_size / 1024 / 1024:.2f} MB)")
-            logging.info(f"  📎 Extension: {file_ext}")
-            logging.info(f"  🏷️ MIME Type: {mime_type}")
+            logger.debug("🔍 Audio file validation:")
+            logger.debug("  📄 File: %s", os.path.basename(audio_file_path))
+            logger.debug("  📏 Size: %s bytes (%.2f MB)", file_size, file_size / 1024 / 1024)
+            logger.debug("  📎 Extension: %s", file_ext)
+            logger.debug("  🏷️ MIME Type: %s", mime_type)
             
             # Check file size (OpenAI limit is 25MB)
             max_size = 25 * 1024 * 1024  # 25MB
@@ -72,103 +451,137 @@ class WhisperService:
                     'error': 'File is empty'
                 }
             
-            # Check for MP3 specific issues
-            if file_ext == '.mp3':
-                logging.info("🔍 MP3 specific validation:")
+            # Check for MP3 specific issues (diagnostic only, logged in debug mode)
+            if file_ext == '.mp3' and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("🔍 MP3 specific validation:")
                 
-                # Try to read first few bytes to check MP3 header
-                with open(audio_file_path, 'rb') as f:
-                    header = f.read(10)
-                    logging.info(f"  📋 Header bytes: {header.hex()}")
-                    
-                    # Check for ID3 tag or MP3 frame header
-                    if header.startswith(b'ID3'):
-                        logging.info("  ✅ ID3 tag found")
-                    elif header[0:2] == b'\xff\xfb' or header[0:2] == b'\xff\xf3' or header[0:2] == b'\xff\xf2':
-                        logging.info("  ✅ MP3 frame header found")
-                    else:
-                        logging.warning(f"  ⚠️ Unusual MP3 header: {header[:4].hex()}")
+                logger.debug("  📋 Header bytes: %s", header[:10].hex())
+                
+                # Check for ID3 tag or MP3 frame header
+                if header.startswith(b'ID3'):
+                    logger.debug("  ✅ ID3 tag found")
+                elif header[:2] in _MP3_FRAME_SYNCS:
+                    logger.debug("  ✅ MP3 frame header found")
+                else:
+                    logger.warning("  ⚠️ Unusual MP3 header: %s", header[:4].hex())
             
             # Supported OpenAI formats
-            openai_formats = {'.flac', '.m4a', '.mp3', '.mp4', '.mpeg', '.mpga', '.oga', '.ogg', '.wav', '.webm'}
-            
-            if file_ext not in openai_formats:
+            if file_ext not in OPENAI_FORMATS:
                 return {
                     'valid': False,
-                    'error': f'File format {file_ext} not supported by OpenAI. Supported: {sorted(openai_formats)}'
+                    'error': f'File format {file_ext} not supported by OpenAI. Supported: {sorted(OPENAI_FORMATS)}'
                 }
             
-            logging.info("✅ File validation passed")
-            return {
+            logger.debug("✅ File validation passed")
+            result = {
                 'valid': True,
                 'file_size': file_size,
                 'file_ext': file_ext,
-                'mime_type': mime_type
+                'mime_type': mime_type,
+                'header_bytes': header,
+                'header_hex': header.hex(),
+                'detected_format': _detect_format(header),
+                'content_hash': content_hash
             }
+            if keep_open:
+                # Ownership moves to the caller
+                audio_file.seek(0)
+                result['file'], audio_file = audio_file, None
+            return result
             
         except Exception as e:
-            logging.error(f"❌ File validation error: {str(e)}")
+            logger.error("❌ File validation error: %s", str(e))
             return {
                 'valid': False,
                 'error': f'Validation error: {str(e)}'
             }
+        finally:
+            if audio_file is not None:
+                audio_file.close()
+    
+    @staticmethod
+    def _may_be_mp3(validation):
+        """
+        Whether cleaning as MP3 can help: the bytes say MP3, or they are
+        unrecognized (e.g. a broken header) and the file is named .mp3
+        """
+        detected_format = validation['detected_format']
+        return detected_format == 'mp3' or (detected_format is None and validation['file_ext'] == '.mp3')
     
     def clean_mp3_file(self, input_path):
         """
         Clean MP3 file using ffmpeg to fix potential format issues
         
+        The cleaned audio is read from ffmpeg's stdout, so nothing is written
+        to disk and there is no temporary file to clean up.
+        
         Args:
             input_path: Path to original MP3 file
             
         Returns:
-            str: Path to cleaned file, or None if failed
+            io.BytesIO: Cleaned MP3 (named 'cleaned.mp3' for the upload), or None if failed
         """
         try:
-            # Create output path
-            input_dir = os.path.dirname(input_path)
-            input_name = os.path.splitext(os.path.basename(input_path))[0]
-            output_path = os.path.join(input_dir, f"{input_name}_cleaned.mp3")
-            
-            logging.info(f"🔧 Cleaning MP3 file: {os.path.basename(input_path)}")
-            
-            # Get ffmpeg executable
-            ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
-            
-            # Clean MP3 file - re-encode to ensure compatibility
-            cmd = [
-                ffmpeg_exe,
+            logger.debug("🔧 Cleaning MP3 file: %s", os.path.basename(input_path))
+            
+            # Usually only the container/header is broken: rewrite it around the
+            # existing MP3 frames without decoding (minimal probing, errors skipped)
+            remux_args = [
+                '-probesize', '32k',
+                '-analyzeduration', '0',
+                '-err_detect', 'ignore_err',
                 '-i', input_path,
-                '-acodec', 'libmp3lame',
-                '-b:a', '192k',
-                '-ar', '44100',  # Standard sample rate
-                '-ac', '2',      # Stereo
-                '-y',            # Overwrite output
-                output_path
+                '-c:a', 'copy',
+                '-f', 'mp3',
+                'pipe:1'
             ]
             
-            logging.info(f"  🏃 Running: {' '.join(cmd[:3])} ... {cmd[-1]}")
+            logger.debug("  🏃 Running: ffmpeg -i ... -c:a copy pipe:1")
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            returncode, cleaned, stderr_tail = read_ffmpeg_output(remux_args)
             
-            if result.returncode != 0:
-                logging.error(f"❌ FFmpeg cleaning failed: {result.stderr}")
-                return None
-            
-            # Check if cleaned file was created and is valid
-            if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                logging.info(f"✅ MP3 file cleaned successfully")
-                logging.info(f"  📏 Original: {os.path.getsize(input_path)} bytes")
-                logging.info(f"  📏 Cleaned: {os.path.getsize(output_path)} bytes")
-                return output_path
+            if returncode != 0 or not cleaned:
+                logger.debug("  🔁 Remux failed, re-encoding: %s", stderr_tail)
+                
+                # Clean MP3 file - re-encode to ensure compatibility
+                args = [
+                    '-i', input_path,
+                    '-acodec', 'libmp3lame',
+                    '-b:a', '192k',
+                    '-ar', '44100',  # Standard sample rate
+                    '-ac', '2',      # Stereo
+                    '-f', 'mp3',
+                    'pipe:1'
+                ]
+                
+                logger.debug("  🏃 Running: ffmpeg %s ... %s", ' '.join(args[:2]), args[-1])
+                
+                returncode, cleaned, stderr_tail = read_ffmpeg_output(args)
+                
+                if returncode != 0:
+                    logger.error("❌ FFmpeg cleaning failed: %s", stderr_tail)
+                    return None
+            
+            # Check if cleaned audio was produced
+            if cleaned:
+                logger.debug("✅ MP3 file cleaned successfully")
+                logger.debug("  📏 Original: %s bytes", os.path.getsize(input_path))
+                logger.debug("  📏 Cleaned: %s bytes", len(cleaned))
+                
+                cleaned_audio = io.BytesIO(cleaned)
+                # The OpenAI client takes the upload's file name from .name
+                cleaned_audio.name = 'cleaned.mp3'
+                return cleaned_audio
             else:
-                logging.error("❌ Cleaned file was not created or is empty")
+                logger.error("❌ Cleaned audio is empty")
                 return None
                 
         except Exception as e:
-            logging.error(f"❌ MP3 cleaning error: {str(e)}")
+            logger.error("❌ MP3 cleaning error: %s", str(e))
             return None
     
-    def transcribe_audio(self, audio_file_path, language=None, translate_to=None):
+    def transcribe_audio(self, audio_file_path, language=None, translate_to=None,
+                         beam_size=None, condition_on_previous_text=None):
         """
         Transcribe audio file to text
         
@@ -176,95 +589,127 @@ class WhisperService:
             audio_file_path: Path to audio file
             language: Optional language code for transcription hint (e.g., 'tr', 'en', 'de')
             translate_to: Optional language to translate the transcription to
+            beam_size: Optional decoding beam size (1 = greedy), honored by the
+                       local faster-whisper model; the OpenAI API picks its own decoding
+            condition_on_previous_text: Optional flag honored by the local model;
+                       False decodes each window independently
         
         Returns:
             dict: Transcription result with text and metadata
         """
+        validation = None
         try:
-            logging.info(f"🎤 Starting transcription for: {os.path.basename(audio_file_path)}")
+            logger.debug("🎤 Starting transcription for: %s", os.path.basename(audio_file_path))
             
-            # Validate audio file first
-            validation = self.validate_audio_file(audio_file_path)
+            # Validate audio file first; the open file is reused for a single-request upload
+            validation = self.validate_audio_file(
+                audio_file_path, compute_hash=self._get_cache() is not None, keep_open=True
+            )
             if not validation['valid']:
-                logging.error(f"❌ Audio file validation failed: {validation['error']}")
+                logger.error("❌ Audio file validation failed: %s", validation['error'])
                 return {
                     'success': False,
                     'error': f"File validation failed: {validation['error']}"
                 }
             
-            client = self.init_client()
-            if not client:
-                return {
-                    'success': False,
-                    'error': 'OpenAI client initialization failed'
-                }
+            # Same audio and language hint as a recent call: reuse its transcript
+            cache_key = self._cache_key(validation, language, 'text')
+            transcript_parts = self._get_cached(cache_key)
             
-            # Log the parameters being sent
-            logging.info(f"🔧 Transcription parameters:")
-            logging.info(f"  🗣️ Language: {language if language else 'auto-detect'}")
-            logging.info(f"  🌐 Translate to: {translate_to if translate_to else 'none'}")
+            # Short clips go to the local model when faster-whisper is installed
+            if transcript_parts is None:
+                transcript_parts = self._local_transcribe(
+                    audio_file_path, validation, language, beam_size, condition_on_previous_text
+                )
+                if transcript_parts is not None:
+                    self._put_cached(cache_key, transcript_parts)
             
-            # First, transcribe the audio
-            cleaned_file_path = None
-            try:
-                with open(audio_file_path, 'rb') as audio_file:
-                    params = {
-                        "model": "whisper-1",
-                        "file": audio_file,
+            if transcript_parts is not None:
+                logger.debug("♻️ Transcript ready without an API call (%s parts)", len(transcript_parts))
+            else:
+                client = self.init_client()
+                if not client:
+                    return {
+                        'success': False,
+                        'error': 'OpenAI client initialization failed'
                     }
-                    
+                
+                # Log the parameters being sent
+                logger.debug("🔧 Transcription parameters:")
+                logger.debug("  🗣️ Language: %s", language if language else 'auto-detect')
+                logger.debug("  🌐 Translate to: %s", translate_to if translate_to else 'none')
+                if beam_size is not None or condition_on_previous_text is not None:
+                    logger.debug("  🎛️ Decoding hints: beam_size=%s, condition_on_previous_text=%s", beam_size, condition_on_previous_text)
+                
+                # Long audio: transcribe fixed-length chunks in parallel and join them
+                chunks = self._segment_audio(audio_file_path, validation)
+                if chunks:
+                    # Plain-text responses: only the transcript is needed here
+                    chunk_params = {"model": "whisper-1", "response_format": "text"}
                     if language:
-                        params["language"] = language
-                    
-                    logging.info(f"📤 Sending request to OpenAI Whisper API...")
-                    logging.info(f"  📋 Model: {params['model']}")
-                    logging.info(f"  📄 File size: {validation['file_size']} bytes")
-                    logging.info(f"  🏷️ File type: {validation['file_ext']}")
+                        chunk_params["language"] = language
                     
-                    response = client.audio.transcriptions.create(**params)
-                    logging.info(f"✅ Received response from OpenAI")
+                    responses = self._transcribe_chunks(client, chunks, chunk_params)
+                    transcript_parts = tuple(_response_text(response) for response, _ in responses)
+                else:
+                    # Otherwise transcribe the whole file in one request
+                    try:
+                        with validation['file'] as audio_file:
+                            params = {
+                                "model": "whisper-1",
+                                "file": audio_file,
+                                "response_format": "text",
+                            }
+                            
+                            if language:
+                                params["language"] = language
+                            
+                            logger.debug("📤 Sending request to OpenAI Whisper API...")
+                            logger.debug("  📋 Model: %s", params['model'])
+                            logger.debug("  📄 File size: %s bytes", validation['file_size'])
+                            logger.debug("  🏷️ File type: %s", validation['file_ext'])
+                            
+                            response = client.audio.transcriptions.create(**params)
+                            logger.debug("✅ Received response from OpenAI")
+                            
+                    except Exception as api_error:
+                        api_error_msg = str(api_error)
+                        logger.error("❌ First attempt failed: %s", api_error_msg)
+                        
+                        # If it's an MP3 file and format error, try cleaning it
+                        if self._may_be_mp3(validation) and "Invalid file format" in api_error_msg:
+                            logger.debug("🔄 Attempting to clean MP3 file and retry...")
+                            
+                            cleaned_audio = self.clean_mp3_file(audio_file_path)
+                            if cleaned_audio:
+                                # Retry with cleaned audio
+                                params["file"] = cleaned_audio
+                                logger.debug("📤 Retrying with cleaned file...")
+                                response = client.audio.transcriptions.create(**params)
+                                logger.debug("✅ Success with cleaned file!")
+                            else:
+                                raise api_error
+                        else:
+                            raise api_error
                     
-            except Exception as api_error:
-                api_error_msg = str(api_error)
-                logging.error(f"❌ First attempt failed: {api_error_msg}")
+                    transcript_parts = (_response_text(response),)
                 
-                # If it's an MP3 file and format error, try cleaning it
-                if validation['file_ext'] == '.mp3' and "Invalid file format" in api_error_msg:
-                    logging.info("🔄 Attempting to clean MP3 file and retry...")
-                    
-                    cleaned_file_path = self.clean_mp3_file(audio_file_path)
-                    if cleaned_file_path:
-                        # Retry with cleaned file
-                        with open(cleaned_file_path, 'rb') as cleaned_audio:
-                            params["file"] = cleaned_audio
-                            logging.info(f"📤 Retrying with cleaned file...")
-                            response = client.audio.transcriptions.create(**params)
-                            logging.info(f"✅ Success with cleaned file!")
-                    else:
-                        raise api_error
-                else:
-                    raise api_error
+                # Chunk transcripts are kept separate so they can be translated in parallel
+                self._put_cached(cache_key, transcript_parts)
             
-            transcribed_text = response.text
-            logging.info(f"📝 Transcription completed. Text length: {len(transcribed_text)} characters")
+            transcribed_text = ' '.join(transcript_parts)
+            logger.debug("📝 Transcription completed. Text length: %s characters", len(transcribed_text))
             
             # If translation is requested, translate using GPT
             if translate_to and translate_to != language:
-                logging.info(f"🔄 Translating to {translate_to}...")
-                translation_result = self.translate_text(transcribed_text, translate_to)
-                if translation_result['success']:
-                    transcribed_text = translation_result['translated_text']
-                    logging.info(f"✅ Translation completed")
+                logger.debug("🔄 Translating to %s...", translate_to)
+                translation_results = self.translate_batch(transcript_parts, translate_to)
+                failed = [result for result in translation_results if not result['success']]
+                if not failed:
+                    transcribed_text = ' '.join(result['translated_text'] for result in translation_results)
+                    logger.debug("✅ Translation completed")
                 else:
-                    logging.warning(f"⚠️ Translation failed: {translation_result['error']}")
-            
-            # Cleanup temporary cleaned file if created
-            if cleaned_file_path and os.path.exists(cleaned_file_path):
-                try:
-                    os.remove(cleaned_file_path)
-                    logging.info(f"🧹 Cleaned up temporary file: {os.path.basename(cleaned_file_path)}")
-                except:
-                    pass
+                    logger.warning("⚠️ Translation failed: %s", failed[0]['error'])
             
             return {
                 'success': True,
@@ -274,30 +719,24 @@ class WhisperService:
             }
         except Exception as e:
             error_msg = str(e)
-            logging.error(f"❌ Transcription error: {error_msg}")
-            
-            # Cleanup temporary cleaned file if created
-            if cleaned_file_path and os.path.exists(cleaned_file_path):
-                try:
-                    os.remove(cleaned_file_path)
-                    logging.info(f"🧹 Cleaned up temporary file after error: {os.path.basename(cleaned_file_path)}")
-                except:
-                    pass
+            logger.error("❌ Transcription error: %s", error_msg)
             
             # Log additional details for debugging
             if "Invalid file format" in error_msg:
-                logging.error("🔍 This appears to be a file format issue")
-                logging.error(f"  📄 File: {audio_file_path}")
-                if os.path.exists(audio_file_path):
-                    logging.error(f"  📏 Size: {os.path.getsize(audio_file_path)} bytes")
-                    with open(audio_file_path, 'rb') as f:
-                        header = f.read(20)
-                        logging.error(f"  📋 File header: {header.hex()}")
+                # Size and header were already read by validate_audio_file
+                logger.error("🔍 This appears to be a file format issue")
+                logger.error("  📄 File: %s", audio_file_path)
+                logger.error("  📏 Size: %s bytes", validation['file_size'])
+                logger.error("  📋 File header: %s", validation['header_hex'])
             
             return {
                 'success': False,
                 'error': error_msg
             }
+        finally:
+            # No-op when the upload already closed it
+            if validation is not None and 'file' in validation:
+                validation['file'].close()
     
     def translate_text(self, text, target_language):
         """
@@ -313,27 +752,12 @@ class WhisperService:
         try:
             client = self.init_client()
             
-            # Language code to name mapping
-            lang_names = {
-                'en': 'English',
-                'tr': 'Turkish', 
-                'de': 'German',
-                'fr': 'French',
-                'es': 'Spanish',
-                'it': 'Italian',
-                'pt': 'Portuguese',
-                'ru': 'Russian',
-                'ja': 'Japanese',
-                'ko': 'Korean',
-                'zh': 'Chinese'
-            }
-            
-            target_lang_name = lang_names.get(target_language, target_language)
+            system_prompt = _SYS_PROMPTS.get(target_language) or _translation_prompt(target_language)
             
             response = client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
-                    {"role": "system", "content": f"You are a professional translator. Translate the following text to {target_lang_name}. Only provide the translation, no explanations."},
+                    {"role": "system", "content": system_prompt},
                     {"role": "user", "content": text}
                 ],
                 temperature=0.3
@@ -351,6 +775,29 @@ class WhisperService:
                 'error': str(e)
             }
     
+    def translate_batch(self, texts, target_language):
+        """
+        Translate several texts to one language in parallel
+        
+        Args:
+            texts: Texts to translate
+            target_language: Target language code or name
+        
+        Returns:
+            list: One translate_text result per text, in the same order
+        """
+        if len(texts) < 2:
+            return [self.translate_text(text, target_language) for text in texts]
+        
+        app = current_app._get_current_object()
+        
+        def translate(text):
+            # Pool threads run outside the request, so each one pushes the app context
+            with app.app_context():
+                return self.translate_text(text, target_language)
+        
+        return list(self._get_executor().map(translate, texts))
+    
     def transcribe_with_timestamps(self, audio_file_path, language=None):
         """
         Transcribe audio with word-level timestamps
@@ -362,108 +809,133 @@ class WhisperService:
         Returns:
             dict: Transcription with timestamps
         """
+        validation = None
         try:
-            logging.info(f"🎤⏰ Starting transcription with timestamps for: {os.path.basename(audio_file_path)}")
+            logger.debug("🎤⏰ Starting transcription with timestamps for: %s", os.path.basename(audio_file_path))
             
-            # Validate audio file first
-            validation = self.validate_audio_file(audio_file_path)
+            # Validate audio file first; the open file is reused for a single-request upload
+            validation = self.validate_audio_file(
+                audio_file_path, compute_hash=self._get_cache() is not None, keep_open=True
+            )
             if not validation['valid']:
-                logging.error(f"❌ Audio file validation failed: {validation['error']}")
+                logger.error("❌ Audio file validation failed: %s", validation['error'])
                 return {
                     'success': False,
                     'error': f"File validation failed: {validation['error']}"
                 }
             
-            client = self.init_client()
-            if not client:
-                return {
-                    'success': False,
-                    'error': 'OpenAI client initialization failed'
-                }
+            # Same audio and language hint as a recent call: reuse its result
+            cache_key = self._cache_key(validation, language, 'verbose_json')
+            result = self._get_cached(cache_key)
             
-            cleaned_file_path = None
-            try:
-                with open(audio_file_path, 'rb') as audio_file:
-                    params = {
+            if result is not None:
+                logger.debug("♻️ Timestamp transcription served from cache")
+            else:
+                client = self.init_client()
+                if not client:
+                    return {
+                        'success': False,
+                        'error': 'OpenAI client initialization failed'
+                    }
+                
+                # Long audio: transcribe fixed-length chunks in parallel and shift
+                # each chunk's word timestamps by its start time
+                chunks = self._segment_audio(audio_file_path, validation)
+                if chunks:
+                    chunk_params = {
                         "model": "whisper-1",
-                        "file": audio_file,
                         "response_format": "verbose_json",
                         "timestamp_granularities": ["word"]
                     }
-                    
                     if language:
-                        params["language"] = language
+                        chunk_params["language"] = language
                     
-                    logging.info(f"📤 Sending timestamp transcription request to OpenAI...")
-                    logging.info(f"  📋 Model: {params['model']}")
-                    logging.info(f"  📄 File size: {validation['file_size']} bytes")
-                    logging.info(f"  🏷️ File type: {validation['file_ext']}")
-                    logging.info(f"  ⏰ With word timestamps")
+                    responses = self._transcribe_chunks(client, chunks, chunk_params)
+                    words = []
+                    for response, offset in responses:
+                        words.extend(self._offset_words(getattr(response, 'words', None), offset))
                     
-                    response = client.audio.transcriptions.create(**params)
-                    logging.info(f"✅ Received timestamp response from OpenAI")
+                    result = {
+                        'text': ' '.join(response.text.strip() for response, _ in responses),
+                        'words': words,
+                        'language': getattr(responses[0][0], 'language', None) or language
+                    }
+                else:
+                    try:
+                        with validation['file'] as audio_file:
+                            params = {
+                                "model": "whisper-1",
+                                "file": audio_file,
+                                "response_format": "verbose_json",
+                                "timestamp_granularities": ["word"]
+                            }
+                            
+                            if language:
+                                params["language"] = language
+                            
+                            logger.debug("📤 Sending timestamp transcription request to OpenAI...")
+                            logger.debug("  📋 Model: %s", params['model'])
+                            logger.debug("  📄 File size: %s bytes", validation['file_size'])
+                            logger.debug("  🏷️ File type: %s", validation['file_ext'])
+                            logger.debug("  ⏰ With word timestamps")
+                            
+                            response = client.audio.transcriptions.create(**params)
+                            logger.debug("✅ Received timestamp response from OpenAI")
+                            
+                    except Exception as api_error:
+                        api_error_msg = str(api_error)
+                        logger.error("❌ First timestamp attempt failed: %s", api_error_msg)
+                        
+                        # If it's an MP3 file and format error, try cleaning it
+                        if self._may_be_mp3(validation) and "Invalid file format" in api_error_msg:
+                            logger.debug("🔄 Attempting to clean MP3 file and retry timestamp transcription...")
+                            
+                            cleaned_audio = self.clean_mp3_file(audio_file_path)
+                            if cleaned_audio:
+                                # Retry with cleaned audio
+                                params["file"] = cleaned_audio
+                                logger.debug("📤 Retrying timestamp transcription with cleaned file...")
+                                response = client.audio.transcriptions.create(**params)
+                                logger.debug("✅ Success with cleaned file (timestamps)!")
+                            else:
+                                raise api_error
+                        else:
+                            raise api_error
                     
-            except Exception as api_error:
-                api_error_msg = str(api_error)
-                logging.error(f"❌ First timestamp attempt failed: {api_error_msg}")
+                    result = {
+                        'text': response.text,
+                        'words': response.words if hasattr(response, 'words') else [],
+                        'language': response.language if hasattr(response, 'language') else language
+                    }
                 
-                # If it's an MP3 file and format error, try cleaning it
-                if validation['file_ext'] == '.mp3' and "Invalid file format" in api_error_msg:
-                    logging.info("🔄 Attempting to clean MP3 file and retry timestamp transcription...")
-                    
-                    cleaned_file_path = self.clean_mp3_file(audio_file_path)
-                    if cleaned_file_path:
-                        # Retry with cleaned file
-                        with open(cleaned_file_path, 'rb') as cleaned_audio:
-                            params["file"] = cleaned_audio
-                            logging.info(f"📤 Retrying timestamp transcription with cleaned file...")
-                            response = client.audio.transcriptions.create(**params)
-                            logging.info(f"✅ Success with cleaned file (timestamps)!")
-                    else:
-                        raise api_error
-                else:
-                    raise api_error
-            
-            # Cleanup temporary cleaned file if created
-            if cleaned_file_path and os.path.exists(cleaned_file_path):
-                try:
-                    os.remove(cleaned_file_path)
-                    logging.info(f"🧹 Cleaned up temporary file (timestamps): {os.path.basename(cleaned_file_path)}")
-                except:
-                    pass
+                self._put_cached(cache_key, result)
             
             return {
                 'success': True,
-                'text': response.text,
-                'words': response.words if hasattr(response, 'words') else [],
-                'language': response.language if hasattr(response, 'language') else language
+                'text': result['text'],
+                'words': result['words'],
+                'language': result['language']
             }
         except Exception as e:
             error_msg = str(e)
-            logging.error(f"❌ Timestamp transcription error: {error_msg}")
-            
-            # Cleanup temporary cleaned file if created
-            if cleaned_file_path and os.path.exists(cleaned_file_path):
-                try:
-                    os.remove(cleaned_file_path)
-                    logging.info(f"🧹 Cleaned up temporary file after error (timestamps): {os.path.basename(cleaned_file_path)}")
-                except:
-                    pass
+            logger.error("❌ Timestamp transcription error: %s", error_msg)
             
             # Log additional details for debugging
             if "Invalid file format" in error_msg:
-                logging.error("🔍 This appears to be a file format issue (timestamp method)")
-                logging.error(f"  📄 File: {audio_file_path}")
-                if os.path.exists(audio_file_path):
-                    logging.error(f"  📏 Size: {os.path.getsize(audio_file_path)} bytes")
-                    with open(audio_file_path, 'rb') as f:
-                        header = f.read(20)
-                        logging.error(f"  📋 File header: {header.hex()}")
+                # Size and header were already read by validate_audio_file
+                logger.error("🔍 This appears to be a file format issue (timestamp method)")
+                logger.error("  📄 File: %s", audio_file_path)
+                logger.error("  📏 Size: %s bytes", validation['file_size'])
+                logger.error("  📋 File header: %s", validation['header_hex'])
             
             return {
                 'success': False,
                 'error': error_msg
             }
+        finally:
+            # No-op when the upload already closed it
+            if validation is not None and 'file' in validation:
+                validation['file'].close()
 
 # Global service instance
 whisper_service = WhisperService()
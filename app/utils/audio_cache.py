@@ -0,0 +1,80 @@
+"""
+In-memory cache for small generated audio files
+
+Short TTS clips are requested right after they are generated (the player
+loads them from /temp, then the user may download them), so recent ones are
+kept as bytes and served without touching the disk.
+"""
+from collections import OrderedDict
+import os
+import threading
+import time
+
+# Total bytes kept in memory, and the largest single file worth caching
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+MAX_ITEM_BYTES = 1024 * 1024
+
+
+class AudioCache:
+    """Thread-safe LRU of file contents bounded by total size in bytes"""
+    
+    def __init__(self, max_bytes=MAX_CACHE_BYTES, max_item_bytes=MAX_ITEM_BYTES):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    def put(self, path, data):
+        """
+        Cache the contents that were just written to path
+        
+        Args:
+            path: File path the data was written to
+            data: File contents (bytes)
+        """
+        if len(data) > self.max_item_bytes:
+            return
+        
+        key = os.path.abspath(path)
+        try:
+            # The file's own mtime, so ETag and Last-Modified match a disk hit
+            modified_time = os.path.getmtime(key)
+        except OSError:
+            modified_time = time.time()
+        entry = (bytes(data), modified_time)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._entries[key] = entry
+            self._size += len(entry[0])
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+    
+    def get(self, path):
+        """
+        Return (data, modified_time) for path, or None if not cached
+        
+        Args:
+            path: File path
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+    
+    def discard(self, path):
+        """Forget path (called when the file is deleted)"""
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= len(entry[0])
+
+
+# Global cache instance
+audio_cache = AudioCache()
@@ -0,0 +1,146 @@
+"""
+FFmpeg helpers
+"""
+from functools import lru_cache
+import os
+import re
+import subprocess
+
+# Only this much of ffmpeg's stderr is kept for error reporting
+STDERR_TAIL_BYTES = 4096
+
+# "Duration: HH:MM:SS.ms" line in FFmpeg's stderr (matched on raw bytes)
+_DURATION_RE = re.compile(rb'Duration: (\d{2}):(\d{2}):(\d{2})\.(\d{2})')
+
+
+@lru_cache(maxsize=None)
+def get_ffmpeg_exe():
+    """
+    Locate the bundled ffmpeg binary once per process
+    
+    imageio_ffmpeg.get_ffmpeg_exe() searches the filesystem on every call;
+    the path never changes while the app runs, so it is resolved a single time.
+    
+    Returns:
+        str: Absolute path to the ffmpeg executable
+    """
+    # Imported here so processes that never run ffmpeg skip loading it
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+@lru_cache(maxsize=None)
+def get_ffprobe_exe():
+    """
+    Locate an ffprobe binary next to the bundled ffmpeg, once per process
+    
+    Returns:
+        str: Path to ffprobe, or None if it is not installed alongside ffmpeg
+    """
+    ffmpeg_exe = get_ffmpeg_exe()
+    # Only the file name: directories such as imageio_ffmpeg/ also contain 'ffmpeg'
+    ffprobe_exe = os.path.join(
+        os.path.dirname(ffmpeg_exe),
+        os.path.basename(ffmpeg_exe).replace('ffmpeg', 'ffprobe', 1)
+    )
+    return ffprobe_exe if os.path.exists(ffprobe_exe) else None
+
+
+def run_ffmpeg(args):
+    """
+    Run ffmpeg without progress output and keep only the tail of stderr
+    
+    Args:
+        args: ffmpeg arguments (without the executable)
+    
+    Returns:
+        tuple: (return code, last STDERR_TAIL_BYTES of stderr as text)
+    """
+    cmd = [get_ffmpeg_exe(), '-nostdin', '-hide_banner', '-loglevel', 'error', '-nostats', *args]
+    result = subprocess.run(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE
+    )
+    
+    # With -loglevel error stderr is empty on success; decode only what is kept
+    return result.returncode, result.stderr[-STDERR_TAIL_BYTES:].decode(errors='replace')
+
+
+def read_ffmpeg_output(args):
+    """
+    Run ffmpeg and collect what it writes to stdout (e.g. an output of 'pipe:1')
+    
+    Args:
+        args: ffmpeg arguments (without the executable)
+    
+    Returns:
+        tuple: (return code, stdout bytes, last STDERR_TAIL_BYTES of stderr as text)
+    """
+    cmd = [get_ffmpeg_exe(), '-nostdin', '-hide_banner', '-loglevel', 'error', '-nostats', *args]
+    result = subprocess.run(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    
+    return result.returncode, result.stdout, result.stderr[-STDERR_TAIL_BYTES:].decode(errors='replace')
+
+
+def parse_ffmpeg_duration(stderr):
+    """Parse "Duration: HH:MM:SS.ms" from FFmpeg stderr bytes, or return None"""
+    if not stderr:
+        return None
+    
+    duration_match = _DURATION_RE.search(stderr)
+    if not duration_match:
+        return None
+    
+    hours = int(duration_match.group(1))
+    minutes = int(duration_match.group(2))
+    seconds = int(duration_match.group(3))
+    centiseconds = int(duration_match.group(4))
+    
+    return hours * 3600 + minutes * 60 + seconds + centiseconds / 100
+
+
+def probe_duration(path):
+    """
+    Read a media file's duration from its container header
+    
+    Uses ffprobe when it is installed next to ffmpeg; -probesize/-analyzeduration
+    keep it from reading packets past the header, which is all format=duration
+    needs. The bundled imageio-ffmpeg ships no ffprobe, so otherwise "ffmpeg -i"
+    with no output is run: it only reads the header and prints
+    "Duration: HH:MM:SS.ms" (exiting non-zero, which is expected).
+    
+    Args:
+        path: Media file path
+    
+    Returns:
+        float: Duration in seconds, or None if the header carries none
+    """
+    ffprobe_exe = get_ffprobe_exe()
+    if not ffprobe_exe:
+        cmd = [get_ffmpeg_exe(), '-nostdin', '-hide_banner', '-i', path]
+        result = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        return parse_ffmpeg_duration(result.stderr)
+    
+    cmd = [
+        ffprobe_exe,
+        '-v', 'error',
+        '-probesize', '32k',
+        '-analyzeduration', '0',
+        '-show_entries', 'format=duration',
+        '-of', 'csv=p=0',
+        path
+    ]
+    result = subprocess.run(cmd, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        # Empty output or "N/A" when the header carries no duration
+        return None
@@ -2,53 +2,90 @@
 File handling utilities
 """
 import os
-from werkzeug.utils import secure_filename
-from flask import current_app
+import secrets
+from urllib.parse import quote
+from flask import current_app, has_app_context, send_file
 import mimetypes
+from io import BytesIO
+from app.utils.audio_cache import audio_cache
+
+# Uploads are copied to disk in 1 MB chunks
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+def _allowed_upload_extensions():
+    """Union of the current app's allowed audio, video and image extensions"""
+    config = current_app.config
+    return (
+        config['ALLOWED_AUDIO_EXTENSIONS']
+        | config['ALLOWED_VIDEO_EXTENSIONS']
+        | config['ALLOWED_IMAGE_EXTENSIONS']
+    )
 
 def allowed_file(filename, allowed_extensions):
     """Check if file extension is allowed"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
-def save_uploaded_file(file, folder='uploads', prefix=''):
+def save_uploaded_file(file, folder='uploads', prefix='', max_size=None):
     """
     Save uploaded file securely
     
+    The upload stream is copied to disk in fixed-size chunks and the size
+    limit is enforced while writing, so oversized uploads are rejected
+    without a full copy followed by a stat.
+    
     Args:
         file: Uploaded file object
         folder: Folder to save file
         prefix: Prefix for filename
+        max_size: Optional maximum file size in bytes
     
     Returns:
-        str: Path to saved file
+        str: Path to saved file, or None if no file was given or it
+             exceeded max_size
     """
     if not file:
         return None
     
-    # Secure filename
-    filename = secure_filename(file.filename)
+    # The stored name is random; only a known extension is kept from the client's name
+    ext = os.path.splitext(file.filename or '')[1].lower()
+    if ext[1:] not in _allowed_upload_extensions():
+        ext = ''
     
     # Add prefix if provided
     if prefix:
-        name, ext = os.path.splitext(filename)
-        filename = f"{prefix}_{os.urandom(8).hex()}{ext}"
+        filename = f"{prefix}_{secrets.token_hex(8)}{ext}"
     else:
-        name, ext = os.path.splitext(filename)
-        filename = f"{os.urandom(8).hex()}{ext}"
+        filename = f"{secrets.token_hex(8)}{ext}"
     
     # Create folder if not exists
     os.makedirs(folder, exist_ok=True)
     
     # Save file
     file_path = os.path.join(folder, filename)
-    file.save(file_path)
+    written = 0
+    too_large = False
+    with open(file_path, 'wb') as out:
+        while True:
+            chunk = file.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            written += len(chunk)
+            if max_size is not None and written > max_size:
+                too_large = True
+                break
+            out.write(chunk)
+    
+    if too_large:
+        cleanup_file(file_path)
+        return None
     
     return file_path
 
 def get_file_extension(filename):
     """Get file extension"""
-    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+    base, dot, ext = filename.rpartition('.')
+    return ext.lower() if dot else ''
 
 def get_file_type(filename):
     """Get file MIME type"""
@@ -73,18 +110,113 @@ def is_image_file(filename):
 def cleanup_file(file_path):
     """Delete file if exists"""
     try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            return True
-    except Exception:
-        pass
-    return False
+        os.unlink(file_path)
+        audio_cache.discard(file_path)
+        return True
+    except (OSError, TypeError):
+        # Missing file, None path, or a failed unlink: nothing left to do
+        return False
+
+def _cleanup_files(file_paths):
+    """Delete a batch of files, ignoring missing ones"""
+    for file_path in file_paths:
+        cleanup_file(file_path)
+
+def schedule_cleanup(*file_paths):
+    """
+    Delete files in the background so the response is not held up by unlink
+    
+    Falls back to deleting synchronously when no reaper is registered.
+    
+    Args:
+        *file_paths: Paths to delete (None entries are skipped)
+    """
+    file_paths = [p for p in file_paths if p]
+    if not file_paths:
+        return
+    
+    reaper = current_app.extensions.get('file_reaper') if has_app_context() else None
+    if reaper is None:
+        _cleanup_files(file_paths)
+    else:
+        reaper.submit(_cleanup_files, file_paths)
 
 def get_file_size(file_path):
     """Get file size in bytes"""
-    return os.path.getsize(file_path) if os.path.exists(file_path) else 0
+    try:
+        return os.stat(file_path).st_size
+    except OSError:
+        return 0
 
 def validate_file_size(file_path, max_size_bytes):
-    """Validate file size"""
-    return get_file_size(file_path) <= max_size_bytes
+    """Validate file size (a missing file is not valid)"""
+    try:
+        return os.stat(file_path).st_size <= max_size_bytes
+    except OSError:
+        return False
 
+def _temp_etag(modified_time, size):
+    """ETag for a temp file, the same whether it is served from memory or disk"""
+    return f'{modified_time}-{size}'
+
+def send_temp_file(file_path, mimetype=None, as_attachment=False, download_name=None):
+    """
+    Send a file that lives in the temp folder
+    
+    When X_ACCEL_REDIRECT_PREFIX is configured, nginx streams the file itself
+    and the worker only returns headers. Otherwise Flask's send_file is used,
+    which honors USE_X_SENDFILE.
+    
+    Args:
+        file_path: Path to a file inside TEMP_FOLDER
+        mimetype: Optional MIME type (guessed from extension if omitted)
+        as_attachment: Send with Content-Disposition: attachment
+        download_name: Filename to use for attachments
+    
+    Returns:
+        Response: Flask response object
+    """
+    accel_prefix = current_app.config.get('X_ACCEL_REDIRECT_PREFIX')
+    if not accel_prefix:
+        # Recently generated small clips are served straight from memory
+        cached = audio_cache.get(file_path)
+        if cached is not None:
+            data, modified_time = cached
+            return send_file(
+                BytesIO(data),
+                mimetype=mimetype or mimetypes.guess_type(file_path)[0] or 'application/octet-stream',
+                as_attachment=as_attachment,
+                download_name=download_name or os.path.basename(file_path),
+                conditional=True,
+                etag=_temp_etag(modified_time, len(data)),
+                last_modified=modified_time
+            )
+        
+        # Relative paths would otherwise be resolved against the app package
+        abs_path = os.path.abspath(file_path)
+        stat = os.stat(abs_path)
+        return send_file(
+            abs_path,
+            mimetype=mimetype,
+            as_attachment=as_attachment,
+            download_name=download_name,
+            conditional=True,
+            etag=_temp_etag(stat.st_mtime, stat.st_size)
+        )
+    
+    temp_folder = current_app.config['TEMP_FOLDER_ABS']
+    relative_path = os.path.relpath(os.path.abspath(file_path), temp_folder)
+    
+    response = current_app.response_class()
+    response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(relative_path.replace(os.sep, '/'))
+    if mimetype:
+        response.content_type = mimetype
+    else:
+        # Let nginx pick the type from the file extension
+        del response.headers['Content-Type']
+    if as_attachment:
+        response.headers.set(
+            'Content-Disposition', 'attachment',
+            filename=download_name or os.path.basename(file_path)
+        )
+    return response
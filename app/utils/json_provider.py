@@ -0,0 +1,41 @@
+"""
+Fast JSON provider backed by orjson
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider that serializes with orjson
+    
+    Types orjson does not know natively fall back to Flask's default
+    handler, so responses look the same as with the stock provider.
+    """
+    
+    _options = 0
+    if orjson is not None:
+        _options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    
+    def dumps(self, obj, **kwargs):
+        """Serialize obj to a JSON string"""
+        return orjson.dumps(obj, default=self.default, option=self._options).decode()
+    
+    def loads(self, s, **kwargs):
+        """Deserialize a JSON string or bytes"""
+        return orjson.loads(s)
+
+
+def init_json_provider(app):
+    """
+    Install the orjson provider on the app when orjson is available
+    
+    Args:
+        app: Flask application
+    """
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
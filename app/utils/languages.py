@@ -0,0 +1,18 @@
+"""
+Language names shared by the transcription and translation services
+"""
+
+# Language code to name mapping
+LANG_NAMES = {
+    'en': 'English',
+    'tr': 'Turkish',
+    'de': 'German',
+    'fr': 'French',
+    'es': 'Spanish',
+    'it': 'Italian',
+    'pt': 'Portuguese',
+    'ru': 'Russian',
+    'ja': 'Japanese',
+    'ko': 'Korean',
+    'zh': 'Chinese'
+}
@@ -0,0 +1,47 @@
+"""
+Server-side storage for per-user state
+
+The session cookie only carries short random ids; the payloads they point to
+live in a process-local TTL cache registered as app.extensions['state'].
+"""
+from flask import current_app, session
+import secrets
+
+
+def _state_store():
+    return current_app.extensions['state']
+
+
+def set_state(key, value):
+    """
+    Store value for the current user under key
+    
+    Args:
+        key: State name (the cookie holds '<key>_id')
+        value: Any Python object
+    """
+    store = _state_store()
+    id_key = f'{key}_id'
+    
+    # Drop the previous payload instead of waiting for it to expire
+    old_id = session.get(id_key)
+    if old_id:
+        store.pop(old_id)
+    
+    state_id = secrets.token_urlsafe(12)
+    store.set(state_id, value)
+    session[id_key] = state_id
+
+
+def get_state(key, default=None):
+    """
+    Return the current user's value for key
+    
+    Args:
+        key: State name
+        default: Returned when nothing is stored or the entry expired
+    """
+    state_id = session.get(f'{key}_id')
+    if not state_id:
+        return default
+    return _state_store().get(state_id, default)
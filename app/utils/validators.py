@@ -3,10 +3,15 @@ Input validation utilities
 """
 import re
 
+# Patterns are compiled once at import instead of on every call
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_UPPER_RE = re.compile(r'[A-Z]')
+_LOWER_RE = re.compile(r'[a-z]')
+_DIGIT_RE = re.compile(r'\d')
+
 def validate_email(email):
     """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return _EMAIL_RE.match(email) is not None
 
 def validate_password(password):
     """
@@ -18,13 +23,13 @@ def validate_password(password):
     if len(password) < 8:
         return False, "Password must be at least 8 characters"
     
-    if not re.search(r'[A-Z]', password):
+    if not _UPPER_RE.search(password):
         return False, "Password must contain at least one uppercase letter"
     
-    if not re.search(r'[a-z]', password):
+    if not _LOWER_RE.search(password):
         return False, "Password must contain at least one lowercase letter"
     
-    if not re.search(r'\d', password):
+    if not _DIGIT_RE.search(password):
         return False, "Password must contain at least one number"
     
     return True, "Password is valid"
@@ -41,3 +46,16 @@ def sanitize_text(text):
     text = text.replace('\x00', '')
     return text
 
+def sanitize_and_check(text, max_length):
+    """
+    Sanitize text and validate its length in one call
+    
+    Args:
+        text: Raw text input
+        max_length: Maximum allowed length after sanitizing
+    
+    Returns:
+        tuple: (sanitized text, True if within max_length)
+    """
+    text = sanitize_text(text)
+    return text, len(text) <= max_length
@@ -0,0 +1,246 @@
+"""
+Cloned voice bookkeeping shared by the voice-clone, TTS and dubbing routes
+
+When VOICE_STORE_REDIS_URL is set, each user's voices live in Redis (one hash
+per user, keyed by a random id kept in the session cookie), so they are shared
+by all workers and survive restarts. Without Redis the list stays in the
+session cookie itself.
+"""
+from flask import current_app, session
+import json
+import secrets
+
+
+class RedisVoiceStore:
+    """
+    Cloned voices in Redis: one hash per user mapping voice_id -> JSON voice
+    
+    Adding or deleting a voice touches a single hash field. The dubbing
+    options derived from the voices are kept in a second hash per user
+    ('count' and serialized 'body'), rewritten on every change.
+    """
+    
+    KEY_PREFIX = 'speechclone:voices:'
+    OPTIONS_PREFIX = 'speechclone:voice_options:'
+    
+    def __init__(self, client, ttl=None):
+        """
+        Args:
+            client: redis.Redis instance
+            ttl: Seconds a user's voices are kept after their last change (None = forever)
+        """
+        self.client = client
+        self.ttl = ttl
+    
+    @classmethod
+    def from_url(cls, url, ttl=None):
+        """Connect to Redis at url (redis://host:port/db)"""
+        # Imported here so deployments without Redis do not need the package
+        import redis
+        return cls(redis.Redis.from_url(url), ttl)
+    
+    def load(self, user_id):
+        """Return the user's voices as a dict of voice_id -> voice"""
+        raw = self.client.hgetall(self.KEY_PREFIX + user_id)
+        return {voice_id.decode(): json.loads(voice) for voice_id, voice in raw.items()}
+    
+    def load_options(self, user_id):
+        """Return the user's stored dubbing options as (count, body), or None"""
+        count, body = self.client.hmget(self.OPTIONS_PREFIX + user_id, 'count', 'body')
+        if count is None:
+            return None
+        return int(count), body or b''
+    
+    def put(self, user_id, voices, options, remove=()):
+        """
+        Store voices (dict of voice_id -> voice), drop the IDs in remove and
+        replace the stored dubbing options
+        """
+        key = self.KEY_PREFIX + user_id
+        pipe = self.client.pipeline()
+        if remove:
+            pipe.hdel(key, *remove)
+        if voices:
+            pipe.hset(key, mapping={voice_id: json.dumps(voice) for voice_id, voice in voices.items()})
+        self._set_options(pipe, user_id, options)
+        if self.ttl:
+            pipe.expire(key, self.ttl)
+        pipe.execute()
+    
+    def remove(self, user_id, voice_id, options):
+        """Delete one voice and replace the stored dubbing options"""
+        pipe = self.client.pipeline()
+        pipe.hdel(self.KEY_PREFIX + user_id, voice_id)
+        self._set_options(pipe, user_id, options)
+        pipe.execute()
+    
+    def _set_options(self, pipe, user_id, options):
+        """Queue a write of the (count, body) dubbing options on pipe"""
+        count, body = options
+        options_key = self.OPTIONS_PREFIX + user_id
+        pipe.hset(options_key, mapping={'count': count, 'body': body})
+        if self.ttl:
+            pipe.expire(options_key, self.ttl)
+
+
+def _dubbing_voice_options(cloned_voices):
+    """
+    Shape cloned voices for the dubbing voice picker and serialize them
+    
+    Returns:
+        tuple: (voice count, compact JSON array body without the brackets)
+    """
+    options = [
+        {
+            'id': v['voice_id'],
+            'name': f"{v['name']} (Cloned)",
+            'type': 'cloned',
+            'description': v.get('description', 'Custom cloned voice')
+        }
+        for v in cloned_voices
+    ]
+    return len(options), json.dumps(options, separators=(',', ':')).encode('utf-8')[1:-1]
+
+
+def _get_store():
+    """The Redis voice store, or None when voices are kept in the cookie"""
+    return current_app.extensions.get('voice_store')
+
+
+def _cookie_voices():
+    """Voices from the session cookie list (dict of voice_id -> voice)"""
+    return {v['voice_id']: v for v in session.get('cloned_voices', [])}
+
+
+def _user_id():
+    """The current user's voice store id, created on first use"""
+    user_id = session.get('voices_id')
+    if not user_id:
+        user_id = secrets.token_urlsafe(12)
+        session['voices_id'] = user_id
+    return user_id
+
+
+def _save_cookie_voices(voices):
+    """Write voices and their dubbing options to the session cookie"""
+    count, body = _dubbing_voice_options(voices.values())
+    session['cloned_voices'] = list(voices.values())
+    session['cloned_voice_options'] = [count, body.decode('utf-8')]
+    return count, body
+
+
+def _load_voices():
+    store = _get_store()
+    if store is None:
+        return _cookie_voices()
+    
+    user_id = session.get('voices_id')
+    if user_id:
+        return store.load(user_id)
+    
+    # First visit since the store was enabled: copy the cookie list over.
+    # The cookie keeps its copy so nothing is lost if Redis is later dropped.
+    voices = _cookie_voices()
+    if voices:
+        store.put(_user_id(), voices, _dubbing_voice_options(voices.values()))
+    return voices
+
+
+def get_cloned_voices():
+    """
+    Return the current user's cloned voices
+    
+    Returns:
+        list: {'voice_id', 'name', 'description'} dicts
+    """
+    return list(_load_voices().values())
+
+
+def add_cloned_voice(voice_id, name, description=None):
+    """
+    Add a cloned voice, replacing any existing voice with the same name
+    
+    Args:
+        voice_id: Provider voice ID
+        name: Display name
+        description: Optional description
+    """
+    voices = _load_voices()
+    
+    # Names are not keys, so finding a same-named voice is still a scan
+    existing_id = next((vid for vid, v in voices.items() if v['name'] == name), None)
+    
+    if existing_id is not None:
+        # Update existing voice
+        voice = dict(voices.pop(existing_id))
+        voice['voice_id'] = voice_id
+        voice['description'] = description
+    else:
+        voice = {
+            'voice_id': voice_id,
+            'name': name,
+            'description': description or ''
+        }
+    
+    voices[voice_id] = voice
+    
+    # Dubbing options are shaped and serialized here, not on every page view
+    store = _get_store()
+    if store is None:
+        _save_cookie_voices(voices)
+    else:
+        replaced = (existing_id,) if existing_id not in (None, voice_id) else ()
+        options = _dubbing_voice_options(voices.values())
+        store.put(_user_id(), {voice_id: voice}, options, remove=replaced)
+
+
+def remove_cloned_voice(voice_id):
+    """
+    Remove a cloned voice by ID (no-op if it is not stored)
+    
+    Args:
+        voice_id: Provider voice ID
+    """
+    # Also copies a cookie-only list into the store before deleting from it
+    voices = _load_voices()
+    if voices.pop(voice_id, None) is None:
+        return
+    
+    store = _get_store()
+    if store is None:
+        _save_cookie_voices(voices)
+    else:
+        store.remove(_user_id(), voice_id, _dubbing_voice_options(voices.values()))
+
+
+def get_cloned_voice_options():
+    """
+    Return the dubbing options for the user's cloned voices
+    
+    Built when voices are saved, not on every read; voices stored before the
+    options were kept alongside them get theirs built once here.
+    
+    Returns:
+        tuple: (voice count, JSON array body without the brackets)
+    """
+    store = _get_store()
+    if store is None:
+        options = session.get('cloned_voice_options')
+        if options is not None:
+            return options[0], options[1].encode('utf-8')
+        voices = _cookie_voices()
+        return _save_cookie_voices(voices) if voices else (0, b'')
+    
+    user_id = session.get('voices_id')
+    if not user_id:
+        # Copies a cookie-only list (and its options) into the store, if any
+        _load_voices()
+        user_id = session.get('voices_id')
+        if not user_id:
+            return 0, b''
+    
+    options = store.load_options(user_id)
+    if options is None:
+        options = _dubbing_voice_options(store.load(user_id).values())
+        store.put(user_id, {}, options)
+    return options
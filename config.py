@@ -4,39 +4,88 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# Settings are read from one snapshot taken after .env is loaded
+_ENV = os.environ.copy()
+
 class Config:
     """Base configuration class"""
     
     # Flask
-    SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
-    FLASK_APP = os.getenv('FLASK_APP', 'app')
-    FLASK_ENV = os.getenv('FLASK_ENV', 'development')
+    SECRET_KEY = _ENV.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+    FLASK_APP = _ENV.get('FLASK_APP', 'app')
+    FLASK_ENV = _ENV.get('FLASK_ENV', 'development')
     
     # OpenAI
-    OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+    OPENAI_API_KEY = _ENV.get('OPENAI_API_KEY')
     
     # Replicate (for Wav2Lip lip-sync)
-    REPLICATE_API_KEY = os.getenv('REPLICATE_API_KEY')
+    REPLICATE_API_KEY = _ENV.get('REPLICATE_API_KEY')
     
     # MiniMax (for voice cloning)
-    MINIMAX_API_KEY = os.getenv('MINIMAX_API_KEY')
-    MINIMAX_GROUP_ID = os.getenv('MINIMAX_GROUP_ID', '')
+    MINIMAX_API_KEY = _ENV.get('MINIMAX_API_KEY')
+    MINIMAX_GROUP_ID = _ENV.get('MINIMAX_GROUP_ID', '')
+    # Accept base64 audio in T2A JSON responses (debugging only; audio_url is expected)
+    ALLOW_B64_AUDIO = _ENV.get('ALLOW_B64_AUDIO', 'false').lower() == 'true'
     
     # File Upload Settings
-    MAX_FILE_SIZE_MB = int(os.getenv('MAX_FILE_SIZE_MB', 200))
+    MAX_FILE_SIZE_MB = int(_ENV.get('MAX_FILE_SIZE_MB', 200))
     MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
-    MAX_TEXT_LENGTH = int(os.getenv('MAX_TEXT_LENGTH', 1000))
-    UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
+    # Werkzeug stops reading request bodies past this (1 MB slack for multipart framing and form fields)
+    MAX_CONTENT_LENGTH = MAX_FILE_SIZE_BYTES + 1024 * 1024
+    MAX_TEXT_LENGTH = int(_ENV.get('MAX_TEXT_LENGTH', 1000))
+    UPLOAD_FOLDER = _ENV.get('UPLOAD_FOLDER', 'uploads')
     TEMP_FOLDER = 'temp'
     
+    # File serving offload (only enable behind a proxy that supports it)
+    # USE_X_SENDFILE: Flask adds an X-Sendfile header (Apache mod_xsendfile, lighttpd)
+    # X_ACCEL_REDIRECT_PREFIX: nginx internal location aliased to TEMP_FOLDER, e.g.
+    #   location /internal_temp/ { internal; alias /path/to/app/temp/; }
+    USE_X_SENDFILE = _ENV.get('USE_X_SENDFILE', 'false').lower() == 'true'
+    X_ACCEL_REDIRECT_PREFIX = _ENV.get('X_ACCEL_REDIRECT_PREFIX', '')
+    # Browser/CDN cache lifetime for generated files under /temp (seconds)
+    TEMP_CACHE_MAX_AGE = int(_ENV.get('TEMP_CACHE_MAX_AGE', 86400))
+    
+    # Server-side session state (the cookie only stores ids into this cache)
+    STATE_CACHE_SIZE = int(_ENV.get('STATE_CACHE_SIZE', 4096))
+    STATE_CACHE_TTL = int(_ENV.get('STATE_CACHE_TTL', 3600))
+    # Cloned voice lists go to Redis when this is set (e.g. redis://localhost:6379/0),
+    # otherwise they are kept in the session cookie
+    VOICE_STORE_REDIS_URL = _ENV.get('VOICE_STORE_REDIS_URL', '')
+    VOICE_STORE_TTL = int(_ENV.get('VOICE_STORE_TTL', 30 * 24 * 3600))
+    
+    # Background jobs (requests with async=1 return a job id to poll at /jobs/<id>)
+    JOB_WORKERS = int(_ENV.get('JOB_WORKERS', 4))
+    JOB_STORE_SIZE = int(_ENV.get('JOB_STORE_SIZE', 1024))
+    JOB_RESULT_TTL = int(_ENV.get('JOB_RESULT_TTL', 3600))
+    
+    # Dubbing: long transcripts are translated and voiced in parallel chunks
+    DUBBING_CHUNK_CHARS = int(_ENV.get('DUBBING_CHUNK_CHARS', 1500))
+    DUBBING_API_WORKERS = int(_ENV.get('DUBBING_API_WORKERS', 8))
+    
+    # Whisper transcripts cached in-process by audio content hash
+    WHISPER_CACHE_ENABLED = _ENV.get('WHISPER_CACHE_ENABLED', 'true').lower() == 'true'
+    WHISPER_CACHE_SIZE = int(_ENV.get('WHISPER_CACHE_SIZE', 256))
+    WHISPER_CACHE_TTL = int(_ENV.get('WHISPER_CACHE_TTL', 24 * 3600))
+    
+    # Long audio is split into chunks of this many seconds and transcribed in parallel
+    WHISPER_CHUNK_SECONDS = int(_ENV.get('WHISPER_CHUNK_SECONDS', 120))
+    # Files smaller than this are always sent in one request
+    WHISPER_CHUNK_MIN_BYTES = int(_ENV.get('WHISPER_CHUNK_MIN_BYTES', 2 * 1024 * 1024))
+    WHISPER_CHUNK_WORKERS = int(_ENV.get('WHISPER_CHUNK_WORKERS', 8))
+    
+    # Local faster-whisper model for short clips (used only when faster-whisper is installed;
+    # 0 disables it). A multilingual model is the default since transcripts are not English-only.
+    LOCAL_WHISPER_MAX_SEC = float(_ENV.get('LOCAL_WHISPER_MAX_SEC', 30))
+    LOCAL_WHISPER_MODEL = _ENV.get('LOCAL_WHISPER_MODEL', 'small')
+    
     # Allowed file extensions
-    ALLOWED_AUDIO_EXTENSIONS = {'mp3', 'wav', 'ogg', 'm4a', 'flac', 'aac'}
-    ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'webm'}
-    ALLOWED_IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'webp'}
+    ALLOWED_AUDIO_EXTENSIONS = frozenset({'mp3', 'wav', 'ogg', 'm4a', 'flac', 'aac'})
+    ALLOWED_VIDEO_EXTENSIONS = frozenset({'mp4', 'avi', 'mov', 'mkv', 'webm'})
+    ALLOWED_IMAGE_EXTENSIONS = frozenset({'jpg', 'jpeg', 'png', 'webp'})
     
     # Application
-    APP_NAME = os.getenv('APP_NAME', 'Speech & Clone App')
-    APP_URL = os.getenv('APP_URL', 'http://localhost:5000')
+    APP_NAME = _ENV.get('APP_NAME', 'Speech & Clone App')
+    APP_URL = _ENV.get('APP_URL', 'http://localhost:5000')
     
     @staticmethod
     def init_app(app):